@@ -3,10 +3,17 @@ import os
 import time
 import io
 import re
+import hashlib
+import functools
 import streamlit as st
 import speech_recognition as sr
 
 from chatbot import SimpleChatbot
+from audio_capture import MicrophoneCapture
+from voice_pipeline import VoicePipeline
+from asr_backends import available_backends, get_backend
+from vad import VoiceActivityDetector
+from tracing import Tracer
 
 st.set_page_config(page_title="Speech Chatbot Pro", page_icon="🗣️", layout="centered")
 st.title("🗣️ Speech-Enabled Chatbot — Pro Features")
@@ -27,7 +34,19 @@ else:
     except FileNotFoundError:
         corpus_text = "Q: What are your hours?\nA: We are open Monday to Friday, 9am–5pm."
 
-bot = SimpleChatbot(corpus_text)
+# Fitted bots are shared process-wide: every session and every rerun with the
+# same corpus reuses one read-only index instead of refitting TF-IDF.
+BOT_CACHE_ENTRIES = 4
+
+
+@st.cache_resource(max_entries=BOT_CACHE_ENTRIES, show_spinner="Indexing knowledge base…")
+def load_bot(corpus_digest: str, _corpus_text: str) -> SimpleChatbot:
+    """Build the bot once per corpus digest; least recently used corpora are evicted."""
+    return SimpleChatbot(_corpus_text, token_cache_size=1024, reply_cache_size=512)
+
+
+corpus_digest = hashlib.sha256(corpus_text.encode("utf-8")).hexdigest()
+bot = load_bot(corpus_digest, corpus_text)
 
 # Recognizer instance (reuse between runs)
 if "recognizer" not in st.session_state:
@@ -39,16 +58,8 @@ r = st.session_state.recognizer
 # -----------------------------
 st.sidebar.subheader("Speech Recognition Settings")
 
-# Check if pocketsphinx is installed
-try:
-    import pocketsphinx  # noqa: F401
-    sphinx_available = True
-except Exception:
-    sphinx_available = False
-
-api_options = ["Google Web Speech"]
-if sphinx_available:
-    api_options.append("Offline Sphinx")
+# Only backends that can run here (e.g. Sphinx needs pocketsphinx installed)
+api_options = available_backends()
 
 engine = st.sidebar.selectbox("Recognition API", api_options, index=0,
                               help="Google uses the web (needs internet). Sphinx is offline if installed.")
@@ -71,7 +82,8 @@ LANG_CHOICES = {
 lang_label = st.sidebar.selectbox("Spoken Language", list(LANG_CHOICES.keys()), index=0)
 lang_code = LANG_CHOICES[lang_label]
 
-noise_dur = st.sidebar.slider("Ambient noise adjust (sec)", 0.0, 2.0, 0.6, 0.1)
+noise_dur = st.sidebar.slider("Ambient noise adjust (sec)", 0.0, 2.0, 0.6, 0.1,
+                              help="Calibrated once when listening starts, then tracked automatically.")
 chunk_sec = st.sidebar.slider("Chunk length (sec)", 3, 15, 6, 1, help="Max seconds per listen chunk")
 
 # -----------------------------
@@ -90,6 +102,26 @@ if "is_listening" not in st.session_state:
 if "is_paused" not in st.session_state:
     st.session_state.is_paused = False
 
+# Long-lived microphone capture and the recognition pipeline draining it
+# (both created on Start, released on Stop)
+if "capture" not in st.session_state:
+    st.session_state.capture = None
+if "pipeline" not in st.session_state:
+    st.session_state.pipeline = None
+if "draining" not in st.session_state:
+    st.session_state.draining = []  # stopped pipelines whose last phrases are still being recognised
+if "last_heard" not in st.session_state:
+    st.session_state.last_heard = ""
+if "voice_error" not in st.session_state:
+    st.session_state.voice_error = ""
+if "vad" not in st.session_state:
+    st.session_state.vad = VoiceActivityDetector()
+if "tracer" not in st.session_state:
+    # Per-stage spans for every voice turn; VOICE_TRACE_FILE also streams them to disk
+    st.session_state.tracer = Tracer(path=os.environ.get("VOICE_TRACE_FILE"))
+
+VOICE_POLL_SEC = 0.5  # how often the page checks the pipeline for finished turns
+
 
 def render_history():
     for role, msg in st.session_state.history[-12:]:
@@ -103,36 +135,102 @@ render_history()
 # -----------------------------
 # Helper: robust transcription
 # -----------------------------
-def transcribe_chunk(engine_name: str, language: str, timeout_s: int, phrase_limit_s: int) -> str:
-    """Capture a short chunk and return text. Raises informative exceptions."""
-    with sr.Microphone() as source:
-        try:
-            r.adjust_for_ambient_noise(source, duration=noise_dur)
-            audio = r.listen(source, timeout=timeout_s, phrase_time_limit=phrase_limit_s)
-        except sr.WaitTimeoutError:
-            raise RuntimeError("No speech detected before timeout. Try speaking sooner or increase timeout.")
-        except OSError as e:
-            raise RuntimeError(f"Microphone error: {e}. Check that a mic is connected and allowed.")
-
-    # Recognition backends
+def recognize_audio(engine_name: str, language: str, audio) -> str:
+    """Recognise one captured chunk. Raises informative exceptions."""
     try:
-        if engine_name == "Google Web Speech":
-            # Google supports language code
-            return r.recognize_google(audio, language=language)
-        elif engine_name == "Offline Sphinx":
-            # Sphinx ignores language codes unless models are installed; still attempt
-            return r.recognize_sphinx(audio)
-        else:
-            raise RuntimeError("Unknown engine selected.")
+        backend = get_backend(engine_name)
+    except ValueError:
+        raise RuntimeError("Unknown engine selected.")
+    try:
+        return backend.recognize(audio, language)
     except sr.UnknownValueError:
         raise RuntimeError("Audio was not clear enough to understand. Please speak clearly and try again.")
     except sr.RequestError as e:
         raise RuntimeError(f"Speech service request failed: {e}")
 
+
+def start_voice(engine_name: str, language: str):
+    """Open the mic (once per session) and start capture -> recognition -> reply in the background."""
+    retire_pipeline()
+    if st.session_state.capture is None:
+        st.session_state.capture = MicrophoneCapture(calibrate_seconds=noise_dur, tracer=st.session_state.tracer)
+    capture = st.session_state.capture.start()
+    # Speech is judged against the session's ambient level, not each chunk's quietest part
+    st.session_state.vad.noise_floor = lambda: capture.calibrator.noise_level
+    # Ambient noise is calibrated once per session by the capture thread and
+    # tracked from non-speech audio since, so listening starts immediately.
+    st.session_state.pipeline = VoicePipeline(
+        capture.source, r,
+        transcribe=functools.partial(recognize_audio, engine_name, language),
+        reply=bot.reply,
+        phrase_time_limit=int(chunk_sec),
+        energy_threshold=lambda: capture.energy_threshold(timeout=noise_dur + 1.0),
+        vad=st.session_state.vad,
+        tracer=st.session_state.tracer,
+    ).start()
+
+
+def retire_pipeline():
+    """Stop the current pipeline; its in-flight phrases keep being collected on later runs."""
+    pipeline = st.session_state.pipeline
+    if pipeline is not None:
+        pipeline.stop()
+        st.session_state.draining.append(pipeline)
+        st.session_state.pipeline = None
+
+
+def stop_voice():
+    """End the listening session and release the mic; in-flight phrases still arrive later."""
+    st.session_state.is_listening = False
+    st.session_state.is_paused = False
+    retire_pipeline()
+    if st.session_state.capture is not None:
+        st.session_state.capture.stop()
+        st.session_state.capture = None
+
+
+def collect_voice_turns() -> bool:
+    """
+    Move finished turns into the transcript and chat history, from stopped
+    pipelines still finishing first, then the live one. Returns True if any arrived.
+    """
+    pipelines = st.session_state.draining + [p for p in (st.session_state.pipeline,) if p is not None]
+    arrived = False
+    now = time.monotonic()
+    for pipeline in pipelines:
+        turns = pipeline.drain()
+        arrived = arrived or bool(turns)
+        for turn in turns:
+            # From the worker finishing the turn to this run picking it up
+            st.session_state.tracer.record("rerun", turn.finished, now, pipeline.trace_id, turn.seq)
+            if turn.error:
+                st.session_state.voice_error = turn.error
+                continue
+            if not turn.text:
+                continue
+            st.session_state.voice_error = ""
+            st.session_state.last_heard = turn.text
+            # Add to transcript buffer
+            if st.session_state.transcript:
+                st.session_state.transcript += " " + turn.text
+            else:
+                st.session_state.transcript = turn.text
+            st.session_state.history.append(("user", turn.text))
+            st.session_state.history.append(("assistant", turn.reply))
+    st.session_state.draining = [p for p in st.session_state.draining if not p.finished]
+    return arrived
+
 # -----------------------------
 # TEXT MODE
 # -----------------------------
 if mode == "Text":
+    # Leaving voice mode ends the voice session: no audio is captured or sent
+    # for recognition while typing. Phrases already in flight still land in the chat.
+    if st.session_state.is_listening:
+        stop_voice()
+    if collect_voice_turns():
+        st.rerun()
+
     prompt = st.chat_input("Type your message…")
     if prompt:
         st.session_state.history.append(("user", prompt))
@@ -150,52 +248,76 @@ else:
     resume = col3.button("⏯️ Resume", disabled=not st.session_state.is_paused)
     stop = col4.button("⏹️ Stop", disabled=not st.session_state.is_listening)
 
-    if engine == "Offline Sphinx" and not sphinx_available:
-        st.warning("Offline Sphinx selected but `pocketsphinx` is not installed. Falling back to Google.")
+    if not get_backend(engine).available():
+        st.warning(f"{engine} is not available here. Falling back to Google.")
         engine = "Google Web Speech"
 
-    # Handle state transitions
+    # Handle state transitions. Start while paused carries on with the paused
+    # pipeline instead of replacing it (and losing the turns it still holds).
+    if start and st.session_state.is_paused:
+        start, resume = False, True
+
     if start:
-        st.session_state.is_listening = True
-        st.session_state.is_paused = False
+        try:
+            start_voice(engine, lang_code)
+            st.session_state.is_listening = True
+            st.session_state.is_paused = False
+        except OSError as e:
+            st.session_state.capture = None
+            st.error(f"Microphone error: {e}. Check that a mic is connected and allowed.")
+        except Exception as e:
+            st.session_state.capture = None
+            st.error(str(e))
 
     if pause:
         st.session_state.is_paused = True
+        if st.session_state.pipeline is not None:
+            st.session_state.pipeline.pause()
 
     if resume:
         st.session_state.is_paused = False
+        # Don't transcribe what was said while paused
+        if st.session_state.capture is not None and st.session_state.capture.running:
+            st.session_state.capture.source.clear()
+        if st.session_state.pipeline is not None:
+            st.session_state.pipeline.resume()
 
     if stop:
-        st.session_state.is_listening = False
-        st.session_state.is_paused = False
+        # The phrase still being recognised (usually the last one spoken) is
+        # collected on a later run, once the stopped pipeline delivers it.
+        stop_voice()
 
     # Display status
     if st.session_state.is_listening and not st.session_state.is_paused:
         st.info(f"Listening… Engine: {engine} | Language: {lang_code}")
     elif st.session_state.is_listening and st.session_state.is_paused:
         st.warning("Paused. Click Resume to continue listening.")
+    elif st.session_state.draining:
+        st.caption("Stopped. Finishing the last phrase…")
     else:
         st.caption("Click Start to begin listening.")
 
-    # If actively listening (not paused), capture one chunk per run and append
-    if st.session_state.is_listening and not st.session_state.is_paused:
-        try:
-            text = transcribe_chunk(engine, lang_code, timeout_s=8, phrase_limit_s=int(chunk_sec))
-            if text:
-                st.success("Heard: " + text)
-                # Add to transcript buffer
-                if st.session_state.transcript:
-                    st.session_state.transcript += " " + text
-                else:
-                    st.session_state.transcript = text
-                # Also run the chatbot on this chunk
-                st.session_state.history.append(("user", text))
-                reply = bot.reply(text)
-                st.session_state.history.append(("assistant", reply))
-                # Rerun to keep capturing next chunk automatically
-                st.rerun()
-        except Exception as e:
-            st.error(str(e))
+    # Capture and recognition run in the background; each run just collects
+    # finished turns and shows them.
+    if collect_voice_turns():
+        st.rerun()
+
+    capture = st.session_state.capture
+    if st.session_state.is_listening and capture is not None and not capture.running:
+        st.error(f"Microphone error: {capture.error}. Check that a mic is connected and allowed.")
+    if st.session_state.last_heard:
+        st.success("Heard: " + st.session_state.last_heard)
+    if st.session_state.voice_error:
+        st.error(st.session_state.voice_error)
+    preprocessor = getattr(getattr(get_backend(engine), "client", None), "preprocessor", None)
+    if preprocessor is not None and preprocessor.audio_seconds:
+        upload = preprocessor.stats()
+        st.caption(f"Upload: {upload['upload_bytes_per_second'] / 1000:.1f} kB/s of audio "
+                   f"(saving {upload['saved_bytes_per_second'] / 1000:.1f} kB/s vs raw PCM).")
+    vad_stats = st.session_state.vad.stats()
+    if vad_stats["chunks_seen"]:
+        st.caption(f"Voice activity filter: skipped {vad_stats['chunks_dropped']} of {vad_stats['chunks_seen']} "
+                   f"chunks, trimmed {vad_stats['seconds_discarded']:.1f}s of {vad_stats['seconds_seen']:.1f}s audio.")
 
 # -----------------------------
 # Transcript panel + Save / Download
@@ -223,3 +345,29 @@ with colB:
         mime="text/plain",
         disabled=not bool(st.session_state.transcript)
     )
+
+# -----------------------------
+# Sidebar: rolling per-stage latency of voice turns
+# -----------------------------
+latency = st.session_state.tracer.breakdown(last=50)
+if latency:
+    st.sidebar.subheader("Voice Latency (last 50 per stage)")
+    st.sidebar.table([
+        {"stage": name, "n": row["count"], "p50 ms": f"{row['p50_ms']:.0f}",
+         "p95 ms": f"{row['p95_ms']:.0f}", "max ms": f"{row['max_ms']:.0f}"}
+        for name, row in latency.items()
+    ])
+    st.sidebar.download_button(
+        label="⬇️ Download spans (JSONL)",
+        data=st.session_state.tracer.to_jsonl().encode("utf-8"),
+        file_name="voice_spans.jsonl",
+        mime="application/x-ndjson",
+    )
+
+# -----------------------------
+# Voice polling: once the page is drawn, check back for the next turn
+# -----------------------------
+listening = mode != "Text" and st.session_state.is_listening and not st.session_state.is_paused
+if listening or st.session_state.draining:
+    time.sleep(VOICE_POLL_SEC)
+    st.rerun()
@@ -0,0 +1,166 @@
+# asr_backends.py — speech recognition engines behind one registry
+import functools
+import hashlib
+import os
+import time
+
+import speech_recognition as sr
+from speech_recognition.recognizers.google import ENDPOINT
+
+from audio_prep import AudioPreprocessor
+from google_client import GoogleWebSpeechClient
+
+
+class ASRBackend:
+    """
+    One recognition engine. Subclasses set the capability flags and implement
+    recognize(audio, language) -> text, raising sr.UnknownValueError when
+    nothing intelligible was heard and sr.RequestError when the engine itself
+    failed, as speech_recognition's recognizers do.
+    """
+    name = ""
+    needs_network = False      # talks to a remote service
+    supports_language = False  # honours the `language` argument
+    preferred_sample_rate = None  # audio is downsampled to this before recognition
+
+    def available(self) -> bool:
+        return True
+
+    def recognize(self, audio: sr.AudioData, language: str) -> str:
+        raise NotImplementedError
+
+
+class GoogleWebSpeechBackend(ASRBackend):
+    """Google Web Speech through a pooled, rate-limited GoogleWebSpeechClient."""
+    name = "Google Web Speech"
+    needs_network = True
+    supports_language = True
+    preferred_sample_rate = 16000
+
+    def __init__(self, client=None):
+        self.client = client or GoogleWebSpeechClient(
+            os.environ.get("GOOGLE_SPEECH_ENDPOINT", ENDPOINT),
+            preprocessor=AudioPreprocessor(self.preferred_sample_rate),
+        )
+
+    def recognize(self, audio, language):
+        return self.client.recognize(audio, language)
+
+
+class SphinxBackend(ASRBackend):
+    name = "Offline Sphinx"
+    preferred_sample_rate = 16000
+
+    def __init__(self):
+        self.recognizer = sr.Recognizer()
+        self.preprocessor = AudioPreprocessor(self.preferred_sample_rate)
+
+    def available(self):
+        return _pocketsphinx_installed()
+
+    def recognize(self, audio, language):
+        # Sphinx ignores language codes unless models are installed
+        return self.recognizer.recognize_sphinx(self.preprocessor.prepare(audio))
+
+
+@functools.lru_cache(maxsize=None)
+def _pocketsphinx_installed() -> bool:
+    """A failed import isn't cached by Python, so probe once per process."""
+    try:
+        import pocketsphinx  # noqa: F401
+        return True
+    except Exception:
+        return False
+
+
+class FixtureBackend(ASRBackend):
+    """
+    Deterministic stand-in engine: returns the known transcript of WAV
+    fixtures, so the whole voice pipeline can be exercised and benchmarked
+    with no network and no microphone. A fixture is `<name>.wav` with its
+    transcript in `<name>.txt` next to it.
+
+    Audio matches a fixture if it is the fixture's PCM, or a stretch of it:
+    Recognizer.listen() over sr.AudioFile(fixture) cuts whole blocks out of
+    the file, so the phrases it yields are byte-for-byte slices. `latency`
+    adds a fixed delay per call to stand in for a remote service.
+    """
+    name = "Fixture (offline stub)"
+
+    def __init__(self, fixtures_dir=None, latency: float = 0.0):
+        self.latency = latency
+        self._by_digest = {}
+        self._fixtures = []  # (pcm bytes, sample_rate, sample_width, transcript)
+        if fixtures_dir:
+            self.load_dir(fixtures_dir)
+
+    def load_dir(self, path):
+        for entry in sorted(os.listdir(path)):
+            stem, ext = os.path.splitext(entry)
+            transcript_path = os.path.join(path, stem + ".txt")
+            if ext.lower() != ".wav" or not os.path.exists(transcript_path):
+                continue
+            with sr.AudioFile(os.path.join(path, entry)) as source:
+                audio = sr.Recognizer().record(source)
+            with open(transcript_path, "r", encoding="utf-8") as f:
+                self.add(audio, f.read().strip())
+        return self
+
+    def add(self, audio: sr.AudioData, transcript: str):
+        self._by_digest[self._digest(audio)] = transcript
+        self._fixtures.append((audio.frame_data, audio.sample_rate, audio.sample_width, transcript))
+
+    def available(self):
+        return bool(self._fixtures)
+
+    def recognize(self, audio, language):
+        if self.latency:
+            time.sleep(self.latency)
+        transcript = self._by_digest.get(self._digest(audio))
+        if transcript is not None:
+            return transcript
+        for pcm, rate, width, transcript in self._fixtures:
+            if rate == audio.sample_rate and width == audio.sample_width and audio.frame_data in pcm:
+                return transcript
+        raise sr.UnknownValueError()
+
+    @staticmethod
+    def _digest(audio):
+        return hashlib.sha1(b"%d:%d:" % (audio.sample_rate, audio.sample_width) + audio.frame_data).digest()
+
+
+_REGISTRY = {}
+_AVAILABLE = None  # cached result of available_backends()
+
+
+def register_backend(backend: ASRBackend) -> ASRBackend:
+    """Add (or replace) a backend under its `name`."""
+    global _AVAILABLE
+    _REGISTRY[backend.name] = backend
+    _AVAILABLE = None
+    return backend
+
+
+def get_backend(name: str) -> ASRBackend:
+    try:
+        return _REGISTRY[name]
+    except KeyError:
+        raise ValueError(f"Unknown recognition backend {name!r}") from None
+
+
+def available_backends(refresh: bool = False):
+    """
+    Names of registered backends that can run here, in registration order.
+    Probed once per process (Streamlit calls this on every rerun) and again
+    after register_backend() or with refresh=True.
+    """
+    global _AVAILABLE
+    if _AVAILABLE is None or refresh:
+        _AVAILABLE = [name for name, backend in _REGISTRY.items() if backend.available()]
+    return list(_AVAILABLE)
+
+
+register_backend(GoogleWebSpeechBackend())
+register_backend(SphinxBackend())
+if os.environ.get("ASR_FIXTURES_DIR"):
+    register_backend(FixtureBackend(os.environ["ASR_FIXTURES_DIR"]))
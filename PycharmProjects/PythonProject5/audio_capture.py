@@ -0,0 +1,183 @@
+# audio_capture.py — one long-lived microphone stream per session, buffered in a ring
+import collections
+import threading
+import time
+
+import numpy as np
+import speech_recognition as sr
+
+
+def block_energy(block: bytes) -> float:
+    """RMS energy of a block of 16-bit PCM, as audioop.rms(block, 2) computes it."""
+    samples = np.frombuffer(block, dtype=np.int16)
+    if not len(samples):
+        return 0.0
+    return float(np.sqrt(np.mean(samples.astype(np.float64) ** 2)))
+
+
+class NoiseCalibrator:
+    """
+    Energy threshold for Recognizer.listen(), maintained from the capture
+    stream itself instead of calling adjust_for_ambient_noise() per chunk.
+    The first `calibrate_seconds` of audio set the initial level; after that
+    only blocks quieter than the threshold (non-speech) nudge it, using the
+    same damped average as speech_recognition's dynamic threshold.
+    """
+    def __init__(self, calibrate_seconds: float = 0.6, initial_threshold: float = 300.0,
+                 ratio: float = 1.5, damping: float = 0.15):
+        self.calibrate_seconds = calibrate_seconds
+        self.energy_threshold = initial_threshold
+        self.ratio = ratio
+        self.damping = damping
+        self.seen_seconds = 0.0
+        self.calibrated = threading.Event()
+        if calibrate_seconds <= 0:
+            self.calibrated.set()
+
+    @property
+    def noise_level(self) -> float:
+        """Estimated ambient RMS energy (the threshold without its speech margin)."""
+        return self.energy_threshold / self.ratio
+
+    def update(self, block: bytes, seconds: float):
+        energy = block_energy(block)
+        self.seen_seconds += seconds
+        if self.calibrated.is_set() and energy >= self.energy_threshold:
+            return  # probably speech: leave the threshold alone
+        damping = self.damping ** seconds  # independent of block size
+        self.energy_threshold = self.energy_threshold * damping + energy * self.ratio * (1 - damping)
+        if self.seen_seconds >= self.calibrate_seconds:
+            self.calibrated.set()
+
+
+class RingBufferSource(sr.AudioSource):
+    """
+    AudioSource backed by a bounded ring of CHUNK-sized blocks that a capture
+    thread keeps filling. Recognizer.listen() and adjust_for_ambient_noise()
+    read from it exactly as they would from an open sr.Microphone, but audio
+    that arrives while nobody is listening (during recognition, a rerun, ...)
+    is kept until read. When the ring is full the oldest block is dropped.
+    """
+    def __init__(self, sample_rate: int, sample_width: int, chunk: int, capacity_blocks: int):
+        self.SAMPLE_RATE = sample_rate
+        self.SAMPLE_WIDTH = sample_width
+        self.CHUNK = chunk
+        self.stream = self  # Recognizer reads via source.stream.read(source.CHUNK)
+        self.dropped_blocks = 0
+        self.closed = False
+        self._blocks = collections.deque(maxlen=max(1, capacity_blocks))
+        self._cond = threading.Condition()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+    def write(self, block: bytes):
+        with self._cond:
+            if len(self._blocks) == self._blocks.maxlen:
+                self.dropped_blocks += 1
+            self._blocks.append(block)
+            self._cond.notify()
+
+    def read(self, size: int) -> bytes:
+        """Return the next captured block, waiting for one; b"" once closed and drained."""
+        with self._cond:
+            while not self._blocks and not self.closed:
+                self._cond.wait()
+            return self._blocks.popleft() if self._blocks else b""
+
+    def clear(self):
+        """Discard buffered audio, e.g. speech captured while the user had paused."""
+        with self._cond:
+            self._blocks.clear()
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+    @property
+    def buffered_seconds(self) -> float:
+        return len(self._blocks) * self.CHUNK / self.SAMPLE_RATE
+
+
+class MicrophoneCapture:
+    """
+    Owns one sr.Microphone for a whole listening session. A daemon thread
+    reads the device continuously into `source` (a RingBufferSource), so each
+    chunk is cut from the buffer with no per-utterance device setup and no
+    speech lost between chunks. The same thread keeps `calibrator` (a
+    NoiseCalibrator) up to date, so listening needs no calibration pause.
+    With a `tracer`, the initial calibration is recorded as a span. Any
+    failure to set up or open the device is raised as OSError.
+    """
+    def __init__(self, device_index=None, sample_rate=None, chunk_size: int = 1024,
+                 buffer_seconds: float = 30.0, calibrate_seconds: float = 0.6, tracer=None):
+        try:
+            self.microphone = sr.Microphone(device_index=device_index, sample_rate=sample_rate,
+                                            chunk_size=chunk_size)
+        except (AttributeError, AssertionError) as e:  # PyAudio missing, bad device index
+            raise OSError(str(e) or "could not set up the microphone") from e
+        self.buffer_seconds = buffer_seconds
+        self.calibrator = NoiseCalibrator(calibrate_seconds)
+        self.tracer = tracer
+        self.source = None
+        self.error = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Open the device and start capturing. Raises OSError if no microphone can be opened."""
+        if self.running:
+            return self
+        mic = self.microphone.__enter__()
+        if mic.stream is None:  # sr.Microphone swallows PyAudio open errors
+            mic.audio.terminate()
+            raise OSError("could not open the input device")
+        capacity = int(self.buffer_seconds * mic.SAMPLE_RATE / mic.CHUNK)
+        self.source = RingBufferSource(mic.SAMPLE_RATE, mic.SAMPLE_WIDTH, mic.CHUNK, capacity)
+        self.error = None
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="mic-capture", daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        mic = self.microphone
+        seconds_per_block = mic.CHUNK / mic.SAMPLE_RATE
+        calibrating = not self.calibrator.calibrated.is_set()
+        started = time.monotonic()
+        try:
+            while not self._stop.is_set():
+                block = mic.stream.read(mic.CHUNK)
+                self.calibrator.update(block, seconds_per_block)
+                self.source.write(block)
+                if calibrating and self.calibrator.calibrated.is_set():
+                    calibrating = False
+                    if self.tracer is not None:
+                        self.tracer.record("calibration", started, time.monotonic(),
+                                           energy_threshold=self.calibrator.energy_threshold)
+        except Exception as e:  # device unplugged, driver error, ...
+            self.error = e
+        finally:
+            self.source.close()
+            self.calibrator.calibrated.set()  # never leave waiters hanging
+            mic.__exit__(None, None, None)
+
+    def energy_threshold(self, timeout=None) -> float:
+        """Current threshold, waiting for the initial calibration to finish first."""
+        self.calibrator.calibrated.wait(timeout)
+        return self.calibrator.energy_threshold
+
+    def stop(self, timeout: float = 1.0):
+        """Stop capturing and release the device."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+        self._thread = None
@@ -0,0 +1,68 @@
+# audio_prep.py — downsample and FLAC-encode chunks before they are uploaded for recognition
+import threading
+
+import numpy as np
+import speech_recognition as sr
+
+
+def resample(samples: np.ndarray, from_rate: int, to_rate: int, taps: int = 63) -> np.ndarray:
+    """
+    Resample 16-bit mono PCM with NumPy only: a windowed-sinc low-pass at the
+    new Nyquist frequency (when downsampling) followed by linear interpolation
+    at the output sample times.
+    """
+    if from_rate == to_rate or not len(samples):
+        return samples.astype(np.int16, copy=False)
+    x = samples.astype(np.float64)
+    if to_rate < from_rate:
+        cutoff = 0.9 * 0.5 * to_rate / from_rate  # cycles per input sample, with a transition band
+        n = np.arange(taps) - (taps - 1) / 2
+        kernel = 2 * cutoff * np.sinc(2 * cutoff * n) * np.hamming(taps)
+        x = np.convolve(x, kernel / kernel.sum(), mode="same")
+    n_out = int(round(len(x) * to_rate / from_rate))
+    t = np.arange(n_out) * (from_rate / to_rate)
+    y = np.interp(t, np.arange(len(x)), x)
+    return np.clip(np.round(y), -32768, 32767).astype(np.int16)
+
+
+class AudioPreprocessor:
+    """
+    Prepares chunks for a remote recogniser: 16-bit samples at the backend's
+    preferred rate (16 kHz by default), then FLAC. speech_recognition's
+    AudioData is already mono (Microphone opens one channel and AudioFile
+    downmixes), so only rate and width need converting. Keeps running totals
+    so the upload saving can be reported in bytes per second of audio.
+    """
+    def __init__(self, target_rate: int = 16000):
+        self.target_rate = target_rate
+        self.audio_seconds = 0.0
+        self.raw_bytes = 0
+        self.encoded_bytes = 0
+        self._lock = threading.Lock()
+
+    def prepare(self, audio: sr.AudioData) -> sr.AudioData:
+        if audio.sample_width == 2 and audio.sample_rate <= self.target_rate:
+            return audio  # never upsample: it only adds bytes
+        pcm = audio.frame_data if audio.sample_width == 2 else audio.get_raw_data(convert_width=2)
+        samples = resample(np.frombuffer(pcm, dtype=np.int16), audio.sample_rate, self.target_rate)
+        return sr.AudioData(samples.tobytes(), self.target_rate, 2)
+
+    def encode(self, audio: sr.AudioData):
+        """Return (prepared AudioData, FLAC bytes) and update the byte counters."""
+        prepared = self.prepare(audio)
+        flac = prepared.get_flac_data()
+        with self._lock:
+            self.audio_seconds += len(audio.frame_data) / (audio.sample_rate * audio.sample_width)
+            self.raw_bytes += len(audio.frame_data)
+            self.encoded_bytes += len(flac)
+        return prepared, flac
+
+    def stats(self):
+        with self._lock:
+            seconds = self.audio_seconds or 1.0
+            return {
+                "audio_seconds": self.audio_seconds,
+                "raw_bytes_per_second": self.raw_bytes / seconds,
+                "upload_bytes_per_second": self.encoded_bytes / seconds,
+                "saved_bytes_per_second": (self.raw_bytes - self.encoded_bytes) / seconds,
+            }
@@ -0,0 +1,189 @@
+# batch_transcribe.py — headless transcription + FAQ matching for directories of recorded audio
+# Usage: python batch_transcribe.py RECORDINGS_DIR -o results.jsonl [--engine NAME] [--workers N]
+#        [--corpus corpus.txt | --index bot.idx] [--fixtures DIR]
+#
+# Each input file becomes one JSON line: file, transcript, answer, score, error and per-stage
+# timings. The output file doubles as the checkpoint: rerunning skips files already in it.
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import speech_recognition as sr
+
+from asr_backends import FixtureBackend, get_backend, register_backend
+from chatbot import SimpleChatbot
+from vad import VoiceActivityDetector
+
+AUDIO_EXTENSIONS = (".wav", ".flac", ".aif", ".aiff")
+
+# Per-process state, set up once by _init_worker
+_bot = None
+_backend = None
+_vad = None
+_options = None
+
+
+def find_audio(root: str):
+    """Audio files under root, as sorted paths relative to it."""
+    found = []
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            if name.lower().endswith(AUDIO_EXTENSIONS):
+                found.append(os.path.relpath(os.path.join(dirpath, name), root))
+    return sorted(found)
+
+
+def load_checkpoint(output_path: str, retry_errors: bool):
+    """Files already recorded in output_path (a truncated last line is ignored)."""
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if not (retry_errors and record.get("error")):
+                done.add(record["file"])
+    return done
+
+
+def _init_worker(options: dict):
+    global _bot, _backend, _vad, _options
+    _options = options
+    if options["fixtures"]:
+        register_backend(FixtureBackend(options["fixtures"]))
+    _backend = get_backend(options["engine"])
+    if options["index"]:
+        _bot = SimpleChatbot.load(options["index"], mmap=True)
+    else:
+        with open(options["corpus"], "r", encoding="utf-8") as f:
+            _bot = SimpleChatbot(f.read())
+    _vad = VoiceActivityDetector() if options["vad"] else None
+
+
+def transcribe_file(rel_path: str) -> dict:
+    """Recognise one recording phrase by phrase, then match the transcript against the FAQ."""
+    timings = {"read": 0.0, "vad": 0.0, "recognize": 0.0, "reply": 0.0}
+    record = {"file": rel_path, "transcript": "", "answer": "", "score": 0.0, "error": None}
+    t_start = time.perf_counter()
+    try:
+        r = sr.Recognizer()
+        phrases = []
+        with sr.AudioFile(os.path.join(_options["input_dir"], rel_path)) as source:
+            while True:
+                t0 = time.perf_counter()
+                try:
+                    audio = r.listen(source, timeout=None, phrase_time_limit=_options["phrase_seconds"])
+                except sr.WaitTimeoutError:
+                    break
+                timings["read"] += time.perf_counter() - t0
+                if not audio.frame_data:
+                    break
+
+                if _vad is not None:
+                    t0 = time.perf_counter()
+                    audio = _vad.trim(audio)
+                    timings["vad"] += time.perf_counter() - t0
+                    if audio is None:
+                        continue
+
+                t0 = time.perf_counter()
+                try:
+                    phrases.append(_backend.recognize(audio, _options["language"]))
+                except sr.UnknownValueError:
+                    pass
+                finally:
+                    timings["recognize"] += time.perf_counter() - t0
+
+        record["transcript"] = " ".join(p for p in phrases if p)
+        if record["transcript"]:
+            t0 = time.perf_counter()
+            record["answer"], record["score"] = _bot.reply_many([record["transcript"]])[0]
+            timings["reply"] = time.perf_counter() - t0
+    except Exception as e:  # keep going: one bad file must not stop the batch
+        record["error"] = f"{type(e).__name__}: {e}"
+    timings["total"] = time.perf_counter() - t_start
+    record["timings"] = {k: round(v, 4) for k, v in timings.items()}
+    return record
+
+
+def repair_tail(output_path: str, block: int = 65536):
+    """
+    Make output_path end with a newline before appending to it. A last line
+    cut short by a crash is truncated away (load_checkpoint() skipped it, so
+    its file is processed again); a complete record missing only its newline
+    gets one.
+    """
+    if not os.path.exists(output_path):
+        return
+    with open(output_path, "rb+") as f:
+        size = f.seek(0, os.SEEK_END)
+        end = size
+        while end > 0:  # find the last newline, reading backwards
+            start = max(0, end - block)
+            f.seek(start)
+            cut = f.read(end - start).rfind(b"\n")
+            if cut >= 0:
+                end = start + cut + 1
+                break
+            end = start
+        if end == size:
+            return
+        f.seek(end)
+        try:
+            json.loads(f.read(size - end))
+        except ValueError:
+            f.truncate(end)
+        else:
+            f.write(b"\n")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Transcribe a directory of recordings and match them to the FAQ.")
+    ap.add_argument("input_dir")
+    ap.add_argument("-o", "--output", default="transcripts.jsonl")
+    ap.add_argument("--engine", default="Google Web Speech", help="recognition backend name")
+    ap.add_argument("--language", default="en-US")
+    ap.add_argument("--corpus", default="corpus.txt", help="Q/A corpus to match transcripts against")
+    ap.add_argument("--index", help="prebuilt SimpleChatbot index (see SimpleChatbot.save); overrides --corpus")
+    ap.add_argument("--fixtures", help="register the offline fixture backend from this directory")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--phrase-seconds", type=float, default=15.0, help="max length of one recognised phrase")
+    ap.add_argument("--no-vad", action="store_true", help="send phrases to the recogniser unfiltered")
+    ap.add_argument("--retry-errors", action="store_true", help="reprocess files whose previous result was an error")
+    args = ap.parse_args(argv)
+
+    files = find_audio(args.input_dir)
+    repair_tail(args.output)
+    done = load_checkpoint(args.output, args.retry_errors)
+    todo = [f for f in files if f not in done]
+    print(f"{len(files)} files, {len(files) - len(todo)} already done, {len(todo)} to process", file=sys.stderr)
+    if not todo:
+        return
+
+    options = {
+        "input_dir": args.input_dir, "engine": args.engine, "language": args.language,
+        "corpus": args.corpus, "index": args.index, "fixtures": args.fixtures,
+        "phrase_seconds": args.phrase_seconds, "vad": not args.no_vad,
+    }
+    t0 = time.perf_counter()
+    errors = 0
+    with open(args.output, "a", encoding="utf-8") as out, \
+            ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker, initargs=(options,)) as pool:
+        futures = [pool.submit(transcribe_file, f) for f in todo]
+        for n, future in enumerate(as_completed(futures), 1):
+            record = future.result()
+            errors += bool(record["error"])
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()  # every finished file is a checkpoint
+            if n % 50 == 0 or n == len(todo):
+                print(f"{n}/{len(todo)} files, {errors} errors, {time.perf_counter() - t0:.1f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
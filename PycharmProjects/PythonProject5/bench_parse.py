@@ -0,0 +1,28 @@
+# bench_parse.py — parse_qa timing on answers with many continuation lines
+# Usage: python bench_parse.py [max_lines]
+import sys
+import time
+
+from chatbot import parse_qa
+
+
+def make_corpus(n_lines: int, n_pairs: int = 4) -> str:
+    body = "\n".join(f"continuation line {i} of a very long answer" for i in range(n_lines))
+    return "\n\n".join(f"Q: question {p}?\nA: first line\n{body}" for p in range(n_pairs))
+
+
+def main(max_lines: int = 64000):
+    print(f"{'lines/answer':>12} {'seconds':>10} {'us/line':>9}")
+    n = 1000
+    while n <= max_lines:
+        corpus = make_corpus(n)
+        t0 = time.perf_counter()
+        parse_qa(corpus)
+        dt = time.perf_counter() - t0
+        # Linear parsing keeps us/line flat as the answers grow.
+        print(f"{n:>12} {dt:>10.4f} {dt / (4 * n) * 1e6:>9.3f}")
+        n *= 2
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 64000)
@@ -0,0 +1,211 @@
+# bench_retrieval.py — how SimpleChatbot build time, index size and reply latency scale with corpus size
+# Usage: python bench_retrieval.py [--sizes 10,100,1000,10000,100000,1000000] [--queries 2000]
+#        [--repeat 3] [--vectorizer tfidf|hashing] [--workers N] [--ann] [-o results.json] [--baseline baseline.json] [--tolerance 0.15]
+#
+# Corpora are synthetic Q/A text in the parse_qa format, generated from a fixed seed,
+# so runs on the same machine are comparable. Save one run's output as the baseline and
+# pass it with --baseline to compare a change against it: the script exits with status 1
+# if any timing or size metric got worse by more than --tolerance. With --ann, reply()
+# runs in approximate mode and recall@10 against exact search is reported too.
+import argparse
+import json
+import platform
+import sys
+import time
+
+import numpy as np
+import scipy
+import sklearn
+
+from chatbot import SimpleChatbot, parse_qa
+
+DEFAULT_SIZES = "10,100,1000,10000,100000,1000000"
+# Lower is better for all of these; compared against the baseline
+COMPARED = ("parse_s", "build_s", "index_bytes", "reply_p50_ms", "reply_p95_ms", "reply_p99_ms", "reply_many_us")
+MIN_COMPARED_SECONDS = 0.005  # shorter parse/build times are mostly timer noise
+
+
+def make_vocabulary(n_words: int, rng):
+    """Pronounceable made-up words, so the analyzer tokenises them like real ones."""
+    consonants, vowels = list("bcdfghjklmnprstvz"), list("aeiou")
+    words = set()
+    while len(words) < n_words:
+        n_syllables = rng.integers(1, 4)
+        words.add("".join(rng.choice(consonants) + rng.choice(vowels) for _ in range(n_syllables)))
+    return sorted(words)
+
+
+def make_corpus(n_pairs: int, seed: int = 0):
+    """Return (corpus text, questions). Word frequencies follow a Zipf-like law, like real FAQs."""
+    rng = np.random.default_rng(seed)
+    vocab = np.array(make_vocabulary(max(200, min(50000, n_pairs // 4)), rng))
+    weights = 1.0 / np.arange(1, len(vocab) + 1)
+    weights /= weights.sum()
+
+    lengths = rng.integers(4, 11, size=n_pairs)
+    words = vocab[rng.choice(len(vocab), size=int(lengths.sum()), p=weights)]
+    bounds = np.concatenate([[0], np.cumsum(lengths)])
+    questions = [" ".join(words[bounds[i]:bounds[i + 1]]) for i in range(n_pairs)]
+    # Answers matter only for parsing cost: keep them short and cheap to generate
+    parts = [f"Q: {q}?\nA: Answer number {i} about {q.split()[0]}." for i, q in enumerate(questions)]
+    return "\n\n".join(parts), questions
+
+
+def make_queries(questions, n: int, seed: int = 1):
+    """Asked questions with a word dropped or an unknown word added, as users do."""
+    rng = np.random.default_rng(seed)
+    queries = []
+    for i in rng.integers(0, len(questions), size=n):
+        words = questions[i].split()
+        if rng.random() < 0.5 and len(words) > 1:
+            words.pop(int(rng.integers(len(words))))
+        else:
+            words.append("please")
+        queries.append(" ".join(words))
+    return queries
+
+
+def index_bytes(bot: SimpleChatbot) -> int:
+    """Bytes held by the fitted index: row matrix, postings, idf and vocabulary."""
+    arrays = [bot.q_matrix.data, bot.q_matrix.indices, bot.q_matrix.indptr,
+              bot.index.postings.data, bot.index.postings.indices, bot.index.postings.indptr,
+              bot.vectorizer.idf_]
+    total = sum(a.nbytes for a in arrays)
+    vocabulary = getattr(bot.vectorizer, "vocabulary_", None) or {}
+    total += sys.getsizeof(vocabulary) + sum(sys.getsizeof(term) for term in vocabulary)
+    return total
+
+
+def best_of(repeat: int, fn):
+    """(fastest wall time, last result) over `repeat` calls."""
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def bench_size(n_pairs: int, n_queries: int, vectorizer: str, repeat: int, ann: bool = False, workers: int = 1):
+    corpus, questions = make_corpus(n_pairs)
+    # corpus is bound as a default argument so the del below really frees it
+    parse_s, _ = best_of(repeat, lambda corpus=corpus: parse_qa(corpus))
+    build_s, bot = best_of(repeat, lambda corpus=corpus: SimpleChatbot(corpus, vectorizer=vectorizer, workers=workers))
+    del corpus
+
+    queries = make_queries(questions, n_queries)
+    extra = {}
+    if ann:
+        t0 = time.perf_counter()
+        bot.enable_ann()
+        extra["ann_build_s"] = time.perf_counter() - t0
+        extra["ann_bytes"] = bot.ann.nbytes
+        recall = bot.ann_recall(queries[:500], k=10)
+        extra["recall_at_10"] = recall["recall"]
+        extra["search_exact_ms"], extra["search_ann_ms"] = recall["exact_ms"], recall["ann_ms"]
+    bot.reply(queries[0])  # first call pays one-off setup (lazy imports, allocations)
+    latencies = np.empty(len(queries))
+    for i, q in enumerate(queries):
+        t0 = time.perf_counter()
+        bot.reply(q)
+        latencies[i] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    bot.reply_many(queries)
+    reply_many_s = time.perf_counter() - t0
+
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000
+    return {
+        "n_pairs": n_pairs,
+        "columns": int(bot.q_matrix.shape[1]),
+        "nnz": int(bot.q_matrix.nnz),
+        "parse_s": parse_s,
+        "build_s": build_s,
+        "index_bytes": index_bytes(bot),
+        "reply_p50_ms": float(p50),
+        "reply_p95_ms": float(p95),
+        "reply_p99_ms": float(p99),
+        "reply_many_us": reply_many_s / len(queries) * 1e6,  # per query, batched
+        **extra,
+    }
+
+
+def compare(results, results_meta, baseline, tolerance: float):
+    """Print per-metric ratios against the baseline; return the number of regressions."""
+    by_size = {r["n_pairs"]: r for r in baseline["results"]}
+    regressions = 0
+    for key in ("vectorizer", "ann"):
+        if baseline["meta"].get(key) != results_meta[key]:
+            print(f"warning: baseline used {key}={baseline['meta'].get(key)!r}, this run {results_meta[key]!r}")
+    print(f"\ncompared with baseline ({baseline['meta'].get('created', '?')}), ratio = new / old:")
+    for r in results:
+        old = by_size.get(r["n_pairs"])
+        if old is None:
+            continue
+        cells = []
+        for metric in COMPARED:
+            if not old.get(metric) or (metric.endswith("_s") and old[metric] < MIN_COMPARED_SECONDS):
+                continue
+            ratio = r[metric] / old[metric]
+            worse = ratio > 1 + tolerance
+            regressions += worse
+            cells.append(f"{metric}={ratio:.2f}{' !' if worse else ''}")
+        print(f"  {r['n_pairs']:>8}  " + "  ".join(cells))
+    return regressions
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark SimpleChatbot build and reply across corpus sizes.")
+    ap.add_argument("--sizes", default=DEFAULT_SIZES, help="comma-separated numbers of Q/A pairs")
+    ap.add_argument("--queries", type=int, default=2000, help="reply() calls timed per size")
+    ap.add_argument("--repeat", type=int, default=3, help="parse/build runs per size; the fastest is kept")
+    ap.add_argument("--vectorizer", default="tfidf", choices=("tfidf", "hashing"))
+    ap.add_argument("--workers", type=int, default=1, help="processes for the index build")
+    ap.add_argument("--ann", action="store_true", help="reply() through the approximate IVF index")
+    ap.add_argument("-o", "--output", default="bench_retrieval.json")
+    ap.add_argument("--baseline", help="earlier results file to compare against")
+    ap.add_argument("--tolerance", type=float, default=0.15, help="allowed slowdown before a metric is flagged")
+    args = ap.parse_args()
+
+    print(f"{'pairs':>8} {'columns':>7} {'parse s':>8} {'build s':>8} {'index MB':>9} "
+          f"{'p50 ms':>7} {'p95 ms':>7} {'p99 ms':>7} {'batch us':>9}")
+    results = []
+    for n in (int(s) for s in args.sizes.split(",")):
+        r = bench_size(n, args.queries, args.vectorizer, args.repeat, args.ann, args.workers)
+        results.append(r)
+        print(f"{n:>8} {r['columns']:>7} {r['parse_s']:>8.3f} {r['build_s']:>8.3f} "
+              f"{r['index_bytes'] / 2**20:>9.2f} {r['reply_p50_ms']:>7.3f} {r['reply_p95_ms']:>7.3f} "
+              f"{r['reply_p99_ms']:>7.3f} {r['reply_many_us']:>9.1f}"
+              + (f"  ann build {r['ann_build_s']:.2f}s recall@10 {r['recall_at_10']:.3f} "
+                 f"search {r['search_exact_ms']:.2f} -> {r['search_ann_ms']:.2f} ms" if args.ann else ""))
+
+    report = {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "scipy": scipy.__version__,
+            "sklearn": sklearn.__version__,
+            "machine": platform.platform(),
+            "vectorizer": args.vectorizer,
+            "ann": args.ann,
+            "workers": args.workers,
+            "queries": args.queries,
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nwrote {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(results, report["meta"], json.load(f), args.tolerance)
+        if regressions:
+            print(f"{regressions} metric(s) regressed by more than {args.tolerance:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
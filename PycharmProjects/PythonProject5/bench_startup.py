@@ -0,0 +1,81 @@
+# bench_startup.py — cold-start report: how long a fresh process takes to import and get ready
+# Usage: python bench_startup.py [--corpus corpus.txt] [--index bot.idx] [--repeat 5] [--top 15]
+#
+# Every step runs in its own fresh interpreter, so nothing is already in sys.modules.
+# Reported times are medians over --repeat runs; "heavy modules" lists which of the
+# HEAVY libraries the step left loaded.
+import argparse
+import importlib.util
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+HEAVY = ("numpy", "scipy", "sklearn", "speech_recognition", "streamlit")
+
+_PROBE = """
+import json, sys, time
+t0 = time.perf_counter()
+{setup}
+elapsed = time.perf_counter() - t0
+print(json.dumps({{"seconds": elapsed, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def steps(corpus: str, index=None):
+    yield "import chatbot", "import chatbot"
+    yield "parse corpus", f"import chatbot; chatbot.parse_qa(open({corpus!r}, encoding='utf-8').read())"
+    yield "build bot from corpus", f"import chatbot; chatbot.SimpleChatbot(open({corpus!r}, encoding='utf-8').read())"
+    if index:
+        yield "load saved index", f"import chatbot; chatbot.SimpleChatbot.load({index!r})"
+    yield "import asr_backends", "import asr_backends"
+    yield "discover backends", "import asr_backends; asr_backends.available_backends()"
+    yield "import voice stack", "import audio_capture, voice_pipeline, vad"
+    if importlib.util.find_spec("streamlit") is not None:
+        yield "import streamlit", "import streamlit"
+
+
+def run_step(setup: str):
+    here = os.path.dirname(os.path.abspath(__file__))
+    out = subprocess.run([sys.executable, "-c", _PROBE.format(setup=setup, heavy=HEAVY)],
+                         cwd=here, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def slowest_imports(module: str, top: int):
+    """Top self-times from `python -X importtime -c 'import module'`, in ms."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                         cwd=here, capture_output=True, text=True, check=True)
+    rows = []
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        rows.append((int(self_us) / 1000, int(cumulative_us) / 1000, name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Report cold-start import and warm-up times.")
+    ap.add_argument("--corpus", default="corpus.txt")
+    ap.add_argument("--index", help="also time SimpleChatbot.load() of this saved index")
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--top", type=int, default=15, help="slowest modules to list for `import chatbot` + backends")
+    args = ap.parse_args()
+
+    print(f"{'step':<24}{'median ms':>10}{'min ms':>9}   heavy modules loaded")
+    for name, setup in steps(os.path.abspath(args.corpus), args.index and os.path.abspath(args.index)):
+        runs = [run_step(setup) for _ in range(args.repeat)]
+        seconds = [r["seconds"] for r in runs]
+        print(f"{name:<24}{statistics.median(seconds) * 1000:>10.1f}{min(seconds) * 1000:>9.1f}   "
+              f"{', '.join(runs[-1]['loaded']) or '-'}")
+
+    print("\nslowest imports for `import chatbot, asr_backends` (self ms / cumulative ms):")
+    for self_ms, cumulative_ms, module in slowest_imports("chatbot, asr_backends", args.top):
+        print(f"  {self_ms:>8.1f} {cumulative_ms:>9.1f}  {module}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# bench_voice.py — offline load test of the voice pipeline with the fixture ASR backend
+# Usage: python bench_voice.py [fixtures_dir] [--workers N] [--latency SEC] [--repeat N]
+import argparse
+import os
+import tempfile
+import time
+import wave
+
+import numpy as np
+import speech_recognition as sr
+
+from asr_backends import FixtureBackend
+from chatbot import SimpleChatbot
+from vad import VoiceActivityDetector
+from voice_pipeline import VoicePipeline
+
+RATE = 16000
+
+
+def make_fixtures(path: str, n: int = 5):
+    """Write n synthetic utterances (tone bursts) with transcripts into `path`."""
+    rng = np.random.default_rng(0)
+    for i in range(n):
+        t = np.arange(int(RATE * (0.6 + 0.2 * i))) / RATE
+        tone = 4000 * np.sin(2 * np.pi * (220 + 40 * i) * t)
+        noise = rng.normal(0, 30, RATE // 2)
+        pcm = np.concatenate([noise, tone, noise]).astype(np.int16)
+        with wave.open(os.path.join(path, f"utt{i}.wav"), "wb") as w:
+            w.setnchannels(1)
+            w.setsampwidth(2)
+            w.setframerate(RATE)
+            w.writeframes(pcm.tobytes())
+        with open(os.path.join(path, f"utt{i}.txt"), "w", encoding="utf-8") as f:
+            f.write(["what are your hours", "where is your office", "how can I contact support",
+                     "what are your hours please", "office location"][i % 5])
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("fixtures_dir", nargs="?", help="WAV + TXT fixtures (synthetic ones if omitted)")
+    ap.add_argument("--workers", type=int, default=2)
+    ap.add_argument("--latency", type=float, default=0.3, help="simulated recognition latency (s)")
+    ap.add_argument("--repeat", type=int, default=3, help="times to replay each fixture")
+    args = ap.parse_args()
+
+    tmp = None
+    fixtures_dir = args.fixtures_dir
+    if not fixtures_dir:
+        tmp = tempfile.TemporaryDirectory()
+        fixtures_dir = tmp.name
+        make_fixtures(fixtures_dir)
+
+    backend = FixtureBackend(fixtures_dir, latency=args.latency)
+    with open("corpus.txt", "r", encoding="utf-8") as f:
+        bot = SimpleChatbot(f.read())
+
+    vad = VoiceActivityDetector()
+    wavs = sorted(n for n in os.listdir(fixtures_dir) if n.lower().endswith(".wav")) * args.repeat
+    turns, errors, audio_seconds = 0, 0, 0.0
+    t0 = time.perf_counter()
+    for name in wavs:
+        with sr.AudioFile(os.path.join(fixtures_dir, name)) as source:
+            audio_seconds += source.DURATION
+            pipeline = VoicePipeline(source, sr.Recognizer(),
+                                     transcribe=lambda audio: backend.recognize(audio, "en-US"),
+                                     reply=bot.reply, workers=args.workers, vad=vad).start()
+            pipeline.join()
+            for turn in pipeline.drain():
+                turns += bool(turn.text)
+                errors += bool(turn.error)
+    elapsed = time.perf_counter() - t0
+
+    print(f"files={len(wavs)} turns={turns} errors={errors} audio={audio_seconds:.1f}s "
+          f"wall={elapsed:.2f}s realtime_factor={elapsed / audio_seconds:.3f}")
+    print("vad:", vad.stats())
+    if tmp is not None:
+        tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
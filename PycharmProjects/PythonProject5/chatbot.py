@@ -1,14 +1,59 @@
 # chatbot.py — Q/A pairing so the bot matches only questions and returns their answers
+import os
 import re
-import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+import json
+import struct
+import time
+import functools
+import importlib
+import threading
+import contextlib
+import pickle
+import tempfile
+from collections import Counter, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from ann import IVFIndex
+from lazy_import import LazyModule
+from profiling import Profiler
+from retrieval import InvertedIndex, top_k_rows
+
+# NumPy, SciPy and scikit-learn load on first use, not at import: parsing and
+# the rest of the app can start while they are still unneeded.
+np = LazyModule("numpy")
+sparse = LazyModule("scipy.sparse")
+
+
+_TOKEN = re.compile(r"\b\w+\b")
 
 
 def simple_analyzer(text: str):
     if not text:
         return []
-    return re.findall(r"\b\w+\b", text.lower())
+    return _TOKEN.findall(text.lower())
+
+
+class CachedAnalyzer:
+    """
+    Bounded LRU in front of an analyzer, for query strings that repeat
+    (voice users ask the same few questions). Returns a fresh list per call.
+    """
+    def __init__(self, analyzer=simple_analyzer, maxsize: int = 4096):
+        self.analyzer = analyzer
+        self._tokens = functools.lru_cache(maxsize=maxsize)(self._tokenize)
+
+    def _tokenize(self, text):
+        return tuple(self.analyzer(text))
+
+    def __call__(self, text):
+        return list(self._tokens(text))
+
+    def cache_info(self):
+        return self._tokens.cache_info()
+
+
+# "Q:" / "A:" marker at the start of a stripped line, either case.
+_QA_MARKER = re.compile(r"([QqAa]):")
 
 
 def parse_qa(corpus_text: str):
@@ -21,31 +66,222 @@ def parse_qa(corpus_text: str):
     Returns (questions, answers). If no pairs found, returns ([], []).
     """
     questions, answers = [], []
+    for q, a in iter_qa((corpus_text or "").splitlines()):
+        questions.append(q)
+        answers.append(a)
+    return questions, answers
+
+
+def iter_qa(lines):
+    """
+    Streaming form of parse_qa: consume any iterable of lines (str or bytes),
+    e.g. a generator or a file opened in text or binary mode, and yield
+    (question, answer) pairs as soon as each one is complete. Only the pair
+    being assembled is held in memory.
+    """
+    # Continuation lines are collected in lists and joined once per pair, so
+    # long multi-line answers stay linear instead of re-copying the string.
     q, a = None, None
 
-    for raw in (corpus_text or "").splitlines():
+    for raw in lines:
+        if isinstance(raw, bytes):
+            raw = raw.decode("utf-8", errors="ignore")
         line = raw.strip()
         if not line:
             continue
-        if line.lower().startswith("q:"):
+        marker = _QA_MARKER.match(line)
+        if marker and marker.group(1) in "Qq":
             if q is not None and a is not None:
-                questions.append(q)
-                answers.append(a)
-            q = line[2:].strip()
+                yield " ".join(q), " ".join(a)
+            q = [line[2:].strip()]
             a = None
-        elif line.lower().startswith("a:"):
-            a = line[2:].strip()
+        elif marker:
+            a = [line[2:].strip()]
         else:
             if a is not None:
-                a += " " + line
+                a.append(line)
             elif q is not None:
-                q += " " + line
+                q.append(line)
 
     if q is not None and a is not None:
-        questions.append(q)
-        answers.append(a)
+        yield " ".join(q), " ".join(a)
 
-    return questions, answers
+
+# On-disk index layout (little endian):
+#   magic (8 bytes) | version (u32) | header length (u32) | JSON header | arrays
+# Each array starts on a 64-byte boundary so it can be memory-mapped in place;
+# the header records its dtype, shape and absolute offset.
+INDEX_MAGIC = b"SCBIDX\x00\x00"
+INDEX_VERSION = 2  # v2 adds the CSC postings ("post_*") used by InvertedIndex
+_PREAMBLE = struct.Struct("<8sII")
+_ALIGN = 64
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // _ALIGN) * _ALIGN
+
+
+class ReplyCache:
+    """
+    Bounded LRU of replies with an optional TTL (seconds), keyed on the
+    analyzer's token tuple so "What are your hours?" and "what are your
+    hours" share an entry. Thread-safe: one bot serves every session.
+
+    clear() starts a new `generation`. A reply computed against the index
+    that was current when the caller read `generation` is only stored by
+    put() if no clear() happened since, so a search that raced with an index
+    refresh can't leave a stale reply cached.
+    """
+    def __init__(self, maxsize: int = 1024, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.generation = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (self.ttl is None or time.monotonic() - entry[1] < self.ttl):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value, generation=None):
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return  # computed before the last clear(): possibly stale
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.generation += 1
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+
+def _make_vectorizer(vocabulary, idf, analyzer=simple_analyzer):
+    """Rebuild a fitted TfidfVectorizer from a term -> column mapping and its idf vector."""
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    vectorizer = TfidfVectorizer(analyzer=analyzer, vocabulary=vocabulary)
+    vectorizer.idf_ = idf
+    return vectorizer
+
+
+def _smoothed_idf(df, n_docs: int):
+    # Same smoothing as TfidfVectorizer(smooth_idf=True).
+    return np.log((1.0 + n_docs) / (1.0 + df)) + 1.0
+
+
+# Imported up front when profiling, so the "init" profile times building the
+# index rather than these libraries' (otherwise lazy) first import.
+_PROFILE_PRELOAD = ("numpy", "scipy.sparse", "sklearn.feature_extraction.text", "sklearn.preprocessing",
+                    "sklearn.decomposition", "sklearn.cluster", "sklearn.random_projection")
+
+# Below this many documents a process pool costs more than it saves.
+PARALLEL_MIN_DOCS = 20000
+
+
+def _count_shard(docs, analyzer):
+    """
+    Process-pool worker for the parallel build: term counts of one shard
+    against a shard-local vocabulary. Returns (terms in local column order,
+    indptr, indices, counts) so the parent can remap columns when merging.
+    """
+    vocab = {}
+    indptr, indices, counts = [0], [], []
+    for doc in docs:
+        row = Counter(vocab.setdefault(tok, len(vocab)) for tok in analyzer(doc))
+        indices.extend(row.keys())
+        counts.extend(row.values())
+        indptr.append(len(indices))
+    return (list(vocab), np.asarray(indptr, dtype=np.int64), np.asarray(indices, dtype=np.int64),
+            np.asarray(counts, dtype=np.float64))
+
+
+def _hash_shard(docs, analyzer, n_features: int):
+    """Process-pool worker for the parallel build in hashing mode."""
+    return HashingTfidfVectorizer(analyzer, n_features).count(docs)
+
+
+def _merge_shards(shards):
+    """
+    Stack shard count matrices into one CSR matrix over a merged vocabulary
+    whose columns are in sorted term order, as TfidfVectorizer lays them out.
+    Returns (counts, vocabulary).
+    """
+    terms = sorted(set().union(*(shard_terms for shard_terms, _, _, _ in shards)))
+    vocabulary = {term: i for i, term in enumerate(terms)}
+    indptr, indices, data = [np.zeros(1, dtype=np.int64)], [], []
+    n_rows = nnz = 0
+    for shard_terms, shard_indptr, shard_indices, shard_counts in shards:
+        remap = np.fromiter((vocabulary[t] for t in shard_terms), dtype=np.int64, count=len(shard_terms))
+        indices.append(remap[shard_indices])
+        data.append(shard_counts)
+        indptr.append(shard_indptr[1:] + nnz)
+        n_rows += len(shard_indptr) - 1
+        nnz += len(shard_indices)
+    counts = sparse.csr_matrix((np.concatenate(data), np.concatenate(indices), np.concatenate(indptr)),
+                               shape=(n_rows, len(terms)))
+    counts.sort_indices()
+    return counts, vocabulary
+
+
+class HashingTfidfVectorizer:
+    """
+    TF-IDF over a fixed hashed feature space: tokens are hashed into
+    n_features columns (no vocabulary dict), and idf is learned per column.
+    Memory stays flat however many distinct tokens the corpus has, at the
+    cost of occasional collisions. Mirrors the TfidfVectorizer calls that
+    SimpleChatbot makes.
+    """
+    def __init__(self, analyzer=simple_analyzer, n_features: int = 2 ** 20):
+        self.analyzer = analyzer
+        self.n_features = n_features
+
+    def set_params(self, **params):
+        for name, value in params.items():
+            setattr(self, name, value)
+        return self
+
+    def count(self, docs, analyzer=None):
+        """Raw term counts per document in hashed feature space."""
+        from sklearn.feature_extraction.text import HashingVectorizer
+        hasher = HashingVectorizer(analyzer=analyzer or self.analyzer, n_features=self.n_features,
+                                   alternate_sign=False, norm=None)
+        return hasher.transform(docs)
+
+    def fit_transform(self, docs):
+        return self.fit_counts(self.count(docs))
+
+    def fit_counts(self, counts):
+        """fit_transform() from precomputed count() rows (e.g. built in parallel)."""
+        df = np.bincount(counts.indices, minlength=self.n_features)
+        self.idf_ = _smoothed_idf(df, counts.shape[0])
+        return self._weight(counts)
+
+    def transform(self, docs):
+        return self._weight(self.count(docs))
+
+    def _weight(self, counts):
+        # Scale the stored counts in place: multiplying by a 2**20-entry diagonal
+        # matrix cost far more than the handful of non-zeros in a query.
+        from sklearn.preprocessing import normalize
+        weighted = sparse.csr_matrix(counts, dtype=np.float64, copy=True)
+        weighted.data *= self.idf_[weighted.indices]
+        return normalize(weighted, copy=False)
 
 
 class SimpleChatbot:
@@ -53,34 +289,313 @@ class SimpleChatbot:
     Retrieval-based FAQ bot:
     - Builds TF-IDF only over FAQ **questions**
     - Returns the paired **answer** with the highest similarity
+
+    `analyzer` is any callable mapping a string to a list of tokens (default
+    simple_analyzer); it is used for indexing and for queries. With
+    token_cache_size > 0 query tokenisation goes through a CachedAnalyzer.
+    reply_cache_size > 0 enables a ReplyCache of finished replies, cleared
+    whenever the index changes.
+
+    vectorizer="hashing" swaps the vocabulary-based TfidfVectorizer for a
+    HashingTfidfVectorizer with `n_features` columns, for corpora whose
+    vocabulary would not fit in memory; see collision_stats().
+
+    `profile` (an output directory, or the CHATBOT_PROFILE environment
+    variable) turns on profiling.Profiler: index building and a sample of
+    reply() calls are profiled with cProfile and tracemalloc and dumped in a
+    per-bot subdirectory there.
+
+    workers > 1 builds the index on a process pool (see _fit_parallel) for
+    corpora of PARALLEL_MIN_DOCS questions or more; the analyzer must then be
+    picklable, i.e. a module-level function.
+
+    ann=True (or enable_ann() with tuning parameters) answers single queries
+    from an approximate IVFIndex instead of the exact inverted index, for
+    corpora with millions of questions; ann_recall() measures what that costs.
+
+    One bot may serve several threads: add_pairs(), remove() and refresh()
+    hold an internal lock, and queries read the vectorizer and index as one
+    consistent pair, so edits can run alongside queries.
     """
-    def __init__(self, corpus_text: str):
+    def __init__(self, corpus_text: str, analyzer=None, token_cache_size: int = 0,
+                 vectorizer: str = "tfidf", n_features: int = 2 ** 20,
+                 reply_cache_size: int = 0, reply_cache_ttl=None, profile=None, ann: bool = False,
+                 workers: int = 1):
+        self._set_profiler(profile)
+        self._set_analyzer(analyzer, token_cache_size)
+        self._set_reply_cache(reply_cache_size, reply_cache_ttl)
+        self._set_vectorizer_kind(vectorizer, n_features, workers)
+        with self._profiling("init"):
+            self._build(corpus_text)
+            if ann:
+                self.enable_ann()
+
+    def _build(self, corpus_text: str):
         qs, ans = parse_qa(corpus_text)
         if qs and ans and len(qs) == len(ans):
             self.questions = qs
             self.answers = ans
-            self.vectorizer = TfidfVectorizer(analyzer= simple_analyzer)
-            self.q_matrix = self.vectorizer.fit_transform(self.questions)
             self.mode = "qa"
+            self._fit(self.questions)
+            return
+
+        self.mode = "sentences"
+        sentences = self._split_sentences(corpus_text or "")
+        if not sentences:
+            sentences = [(corpus_text or "I have no data yet.").strip()]
+        self.sentences = sentences
+        self._fit(self.sentences)
+
+    @classmethod
+    def from_lines(cls, lines, analyzer=None, token_cache_size: int = 0,
+                   vectorizer: str = "tfidf", n_features: int = 2 ** 20,
+                   reply_cache_size: int = 0, reply_cache_ttl=None, profile=None, ann: bool = False,
+                   workers: int = 1):
+        """
+        Build a Q/A bot from an iterable of lines or an open file via iter_qa(),
+        without first reading the whole corpus into one string.
+        """
+        bot = cls.__new__(cls)
+        bot._set_profiler(profile)
+        bot._set_analyzer(analyzer, token_cache_size)
+        bot._set_reply_cache(reply_cache_size, reply_cache_ttl)
+        bot._set_vectorizer_kind(vectorizer, n_features, workers)
+        with bot._profiling("init"):
+            questions, answers = [], []
+            for q, a in iter_qa(lines):
+                questions.append(q)
+                answers.append(a)
+            if not questions:
+                raise ValueError("No Q:/A: pairs found in input.")
+            bot.questions = questions
+            bot.answers = answers
+            bot.mode = "qa"
+            bot._fit(bot.questions)
+            if ann:
+                bot.enable_ann()
+        return bot
+
+    def _set_profiler(self, profile):
+        self.profiler = Profiler.from_setting(profile)
+        if self.profiler is not None:
+            for name in _PROFILE_PRELOAD:
+                importlib.import_module(name)
+
+    def _profiling(self, label: str):
+        if self.profiler is None:
+            return contextlib.nullcontext()
+        return self.profiler.profile(label)
+
+    def _set_analyzer(self, analyzer, token_cache_size: int):
+        self.analyzer = analyzer or simple_analyzer
+        if token_cache_size:
+            self.query_analyzer = CachedAnalyzer(self.analyzer, maxsize=token_cache_size)
         else:
-            self.mode = "sentences"
-            sentences = self._split_sentences(corpus_text or "")
-            if not sentences:
-                sentences = [(corpus_text or "I have no data yet.").strip()]
-            self.sentences = sentences
-            self.vectorizer = TfidfVectorizer(analyzer= simple_analyzer)
-            self.q_matrix = self.vectorizer.fit_transform(self.sentences)
+            self.query_analyzer = self.analyzer
+
+    def _set_reply_cache(self, size: int, ttl):
+        self.reply_cache = ReplyCache(size, ttl) if size else None
+
+    def _set_vectorizer_kind(self, kind: str, n_features: int, workers: int = 1):
+        if kind not in ("tfidf", "hashing"):
+            raise ValueError(f"Unknown vectorizer {kind!r}; expected 'tfidf' or 'hashing'.")
+        self.vectorizer_kind = kind
+        self.n_features = n_features
+        self.workers = max(1, workers)
+
+    def _fit(self, docs):
+        if self.workers > 1 and len(docs) >= PARALLEL_MIN_DOCS:
+            self._fit_parallel(docs)
+        elif self.vectorizer_kind == "hashing":
+            self.vectorizer = HashingTfidfVectorizer(self.analyzer, self.n_features)
+            self.q_matrix = self.vectorizer.fit_transform(docs)
+        else:
+            from sklearn.feature_extraction.text import TfidfVectorizer
+            self.vectorizer = TfidfVectorizer(analyzer=self.analyzer)
+            self.q_matrix = self.vectorizer.fit_transform(docs)
+        # Indexing is done; from here on the vectorizer only sees queries.
+        self.vectorizer.set_params(analyzer=self.query_analyzer)
+        self.index = InvertedIndex.from_rows(self.q_matrix)
+        self.ann = None
+        self._init_edit_state(self.q_matrix.shape[0])
+
+    def _fit_parallel(self, docs):
+        """
+        Same result as the single-process fit, built on `workers` processes:
+        each tokenises and counts one contiguous shard of the documents (with
+        its own vocabulary in tfidf mode), then the parent merges vocabularies
+        and stacks the count blocks, and computes df, idf and the normalised
+        rows once over the whole corpus.
+        """
+        from sklearn.preprocessing import normalize
+        try:
+            pickle.dumps(self.analyzer)
+        except Exception:
+            raise ValueError("workers > 1 needs a picklable analyzer (a module-level function).") from None
+        size = -(-len(docs) // self.workers)
+        shards = [docs[i:i + size] for i in range(0, len(docs), size)]
+        analyzers = [self.analyzer] * len(shards)
+        with ProcessPoolExecutor(max_workers=len(shards)) as pool:
+            if self.vectorizer_kind == "hashing":
+                blocks = list(pool.map(_hash_shard, shards, analyzers, [self.n_features] * len(shards)))
+            else:
+                counted = list(pool.map(_count_shard, shards, analyzers))
+
+        if self.vectorizer_kind == "hashing":
+            self.vectorizer = HashingTfidfVectorizer(self.analyzer, self.n_features)
+            self.q_matrix = self.vectorizer.fit_counts(sparse.vstack(blocks, format="csr"))
+        else:
+            counts, vocabulary = _merge_shards(counted)
+            idf = _smoothed_idf(np.bincount(counts.indices, minlength=len(vocabulary)), counts.shape[0])
+            self.vectorizer = _make_vectorizer(vocabulary, idf, self.analyzer)
+            self.q_matrix = normalize(sparse.csr_matrix(counts @ sparse.diags(idf)))
+
+    def enable_ann(self, dims: int = 128, n_lists=None, n_probe: int = 8, candidates: int = 256,
+                   projection=None, seed: int = 0, max_postings: int = 500):
+        """
+        Build an IVFIndex (see ann.py for the parameters) and use it for
+        search()/reply(). search_many() stays exact. The projection defaults
+        to "svd", or "random" with vectorizer="hashing", where SVD components
+        would be a dense dims x n_features matrix. After edits, refresh()
+        files new rows into the existing index instead of rebuilding it; call
+        enable_ann() again to refit. Set `bot.ann = None` for exact search.
+        """
+        self.refresh()
+        if projection is None:
+            projection = "random" if self.vectorizer_kind == "hashing" else "svd"
+        rows, postings = self.q_matrix, self.index.postings
+        ann = IVFIndex(rows, postings=postings, dims=dims, n_lists=n_lists, n_probe=n_probe,
+                       candidates=candidates, projection=projection, seed=seed, max_postings=max_postings)
+        with self._edit_lock:
+            if self.q_matrix is not rows:  # refreshed by another thread during the build
+                ann = ann.with_rows(self.q_matrix, self.index.postings)
+            self.ann = ann
+        return self
+
+    def search(self, user_text: str, k: int = 5):
+        """Return up to k (row, score) matches for user_text, best first."""
+        self.refresh()
+        vectorizer, index = self._snapshot()
+        return index.search(vectorizer.transform([user_text]), k)
+
+    def _snapshot(self):
+        """(vectorizer, search index) as one pair: refresh() may be swapping them."""
+        with self._edit_lock:
+            return self.vectorizer, (self.ann if self.ann is not None else self.index)
+
+    def ann_recall(self, queries, k: int = 10):
+        """
+        recall@k of the ANN index against exact search over `queries`: the
+        share of exact top-k results the ANN search also finds, where a row
+        scoring at least the exact k-th score counts (ties are interchangeable).
+        Also reports how often the best score is found and mean latencies.
+        """
+        if self.ann is None:
+            raise ValueError("ANN mode is off; call enable_ann() first.")
+        self.refresh()
+        with self._edit_lock:
+            vectorizer, index, ann = self.vectorizer, self.index, self.ann
+        found = expected = top1 = n = 0
+        exact_s = ann_s = 0.0
+        for text in queries:
+            user_vec = vectorizer.transform([text])
+            t0 = time.perf_counter()
+            exact = index.search(user_vec, k)
+            t1 = time.perf_counter()
+            approx = ann.search(user_vec, k)
+            ann_s += time.perf_counter() - t1
+            exact_s += t1 - t0
+            n += 1
+            if not exact:
+                continue
+            kth_score = exact[-1][1] - 1e-9
+            found += sum(1 for _, score in approx if score >= kth_score)
+            expected += len(exact)
+            top1 += bool(approx) and approx[0][1] >= exact[0][1] - 1e-9
+        return {
+            "k": k,
+            "queries": n,
+            "recall": found / expected if expected else 1.0,
+            "top1_agreement": top1 / n if n else 1.0,
+            "exact_ms": exact_s * 1000 / max(n, 1),
+            "ann_ms": ann_s * 1000 / max(n, 1),
+        }
 
     def reply(self, user_text: str) -> str:
+        if self.profiler is not None and self.profiler.sample():
+            with self.profiler.profile("reply"):
+                return self._reply(user_text)
+        return self._reply(user_text)
+
+    def _reply(self, user_text: str) -> str:
         user_text = (user_text or "").strip()
         if not user_text:
             return "Say something and I'll try to help!"
 
-        user_vec = self.vectorizer.transform([user_text])
-        sims = cosine_similarity(user_vec, self.q_matrix).flatten()
-        idx = int(np.argmax(sims))
-        score = float(sims[idx])
+        if self.reply_cache is None:
+            hits = self.search(user_text, k=1)
+            idx, score = hits[0] if hits else (0, 0.0)
+            return self._pick(idx, score)
+
+        self.refresh()  # drops cached replies if the index was edited
+        key = tuple(self.query_analyzer(user_text))
+        cached = self.reply_cache.get(key)
+        if cached is not None:
+            return cached[0]
+        generation = self.reply_cache.generation  # before searching: refresh() bumps it
+        hits = self.search(user_text, k=1)
+        idx, score = hits[0] if hits else (0, 0.0)
+        answer = self._pick(idx, score)
+        self.reply_cache.put(key, (answer, score), generation)  # the score too, for reply_many()
+        return answer
 
+    def search_many(self, texts, k: int = 5, batch_size: int = 1024):
+        """
+        Batched search(): each chunk of `batch_size` texts is vectorised once and
+        scored with a single sparse product against q_matrix, which bounds the
+        size of the intermediate (chunk x corpus) score matrix.
+        """
+        self.refresh()
+        with self._edit_lock:
+            vectorizer, index = self.vectorizer, self.index
+        texts = list(texts)
+        results = []
+        doc_terms = index.postings.T  # CSC postings transposed: a free CSR view
+        for start in range(0, len(texts), batch_size):
+            user_vecs = vectorizer.transform(texts[start:start + batch_size])
+            results.extend(top_k_rows(user_vecs @ doc_terms, k))
+        return results
+
+    def reply_many(self, texts, batch_size: int = 1024):
+        """
+        Reply to many texts at once; returns (reply, score) pairs in input order.
+        Shares the reply cache with reply(): only cache misses are searched.
+        """
+        texts = [(t or "").strip() for t in texts]
+        out = [("Say something and I'll try to help!", 0.0)] * len(texts)
+        todo = [i for i, t in enumerate(texts) if t]
+        keys = {}
+        if self.reply_cache is not None:
+            self.refresh()  # drops cached replies if the index was edited
+            misses = []
+            for i in todo:
+                keys[i] = tuple(self.query_analyzer(texts[i]))
+                cached = self.reply_cache.get(keys[i])
+                if cached is None:
+                    misses.append(i)
+                else:
+                    out[i] = cached
+            todo = misses
+            generation = self.reply_cache.generation  # before searching: refresh() bumps it
+        hits = self.search_many([texts[i] for i in todo], k=1, batch_size=batch_size)
+        for i, row in zip(todo, hits):
+            idx, score = row[0] if row else (0, 0.0)
+            out[i] = (self._pick(idx, score), score)
+            if self.reply_cache is not None:
+                self.reply_cache.put(keys[i], out[i], generation)
+        return out
+
+    def _pick(self, idx: int, score: float) -> str:
         if score < 0.10:
             return "I'm not sure I understood. Could you rephrase?"
 
@@ -89,6 +604,268 @@ class SimpleChatbot:
         else:
             return self.sentences[idx]
 
+    # -----------------------------
+    # Incremental updates
+    # -----------------------------
+    def add_pairs(self, questions, answers):
+        """
+        Append Q/A pairs to the index without refitting. Document frequencies
+        are updated right away; idf and row weights are recomputed lazily before
+        the next query, or on an explicit refresh(). Returns the new row ids.
+        """
+        if self.mode != "qa":
+            raise ValueError("add_pairs() needs a Q/A corpus; this bot was built from plain sentences.")
+        questions, answers = list(questions), list(answers)
+        if len(questions) != len(answers):
+            raise ValueError("questions and answers must have the same length.")
+        with self._edit_lock:
+            self._start_editing()
+
+            if self.vectorizer_kind == "hashing":
+                new_rows = self.vectorizer.count(questions, analyzer=self.analyzer)
+                n_terms = self.n_features
+            else:
+                new_rows, n_terms = self._count_new(questions)
+            tf = self._tf
+            tf = sparse.csr_matrix((tf.data, tf.indices, tf.indptr), shape=(tf.shape[0], n_terms))
+            self._tf = sparse.vstack([tf, new_rows], format="csr")
+            self._df = np.pad(self._df, (0, n_terms - len(self._df)))
+            self._df += np.bincount(new_rows.indices, minlength=n_terms)
+
+            first = len(self.questions)
+            self.questions = self.questions + questions
+            self.answers = self.answers + answers
+            self._live = np.concatenate([self._live, np.ones(len(questions), dtype=bool)])
+            self._dirty = True
+            return list(range(first, first + len(questions)))
+
+    def _count_new(self, questions):
+        """Count rows for new questions, growing the vocabulary as needed."""
+        vocab = self._vocab
+        indptr, indices, counts = [0], [], []
+        for question in questions:
+            row = Counter(vocab.setdefault(tok, len(vocab)) for tok in self.analyzer(question))
+            indices.extend(row.keys())
+            counts.extend(row.values())
+            indptr.append(len(indices))
+        n_terms = len(vocab)
+        rows = sparse.csr_matrix((np.asarray(counts, dtype=np.float64), indices, indptr),
+                                 shape=(len(questions), n_terms))
+        return rows, n_terms
+
+    def remove(self, ids):
+        """
+        Drop rows from the index. Ids are row positions as returned by search()
+        and add_pairs(); the ids of the remaining rows do not change.
+        """
+        ids = np.unique(np.asarray(list(ids), dtype=np.intp))
+        if len(ids) and (ids[0] < 0 or ids[-1] >= len(self._live)):
+            raise IndexError("row id out of range")
+        with self._edit_lock:
+            self._start_editing()
+            ids = ids[self._live[ids]]
+            if not len(ids):
+                return
+            self._df -= np.bincount(self._tf[ids].indices, minlength=len(self._df))
+            self._live[ids] = False
+            self._dirty = True
+
+    def refresh(self):
+        """Recompute idf and the normalised rows after add_pairs()/remove()."""
+        from sklearn.preprocessing import normalize
+        if not self._dirty:
+            return
+        with self._edit_lock:
+            if not self._dirty:  # another thread refreshed while this one waited
+                return
+            idf = _smoothed_idf(self._df, int(self._live.sum()))
+            tf = sparse.diags(self._live.astype(np.float64)) @ self._tf
+            tf.eliminate_zeros()
+            self._tf = tf
+            self.q_matrix = normalize(sparse.csr_matrix(tf @ sparse.diags(idf)))
+            if self.vectorizer_kind == "hashing":
+                # A new instance, not idf_ set in place: queries may hold the old one
+                self.vectorizer = HashingTfidfVectorizer(self.query_analyzer, self.n_features)
+                self.vectorizer.idf_ = idf
+            else:
+                # A full rebuild would not know terms found only in removed rows; weighting
+                # them 0 keeps them out of query vectors (and their norms) the same way.
+                idf = np.where(self._df > 0, idf, 0.0)
+                self.vectorizer = _make_vectorizer(self._vocab, idf, self.query_analyzer)
+            self.index = InvertedIndex.from_rows(self.q_matrix)
+            if self.ann is not None:
+                self.ann = self.ann.with_rows(self.q_matrix, self.index.postings)
+            if self.reply_cache is not None:
+                self.reply_cache.clear()
+            self._dirty = False
+
+    def _init_edit_state(self, n_rows: int, removed=()):
+        self._live = np.ones(n_rows, dtype=bool)
+        self._live[list(removed)] = False
+        self._tf = None
+        self._df = None
+        self._vocab = None
+        self._dirty = False
+        self._edit_lock = threading.RLock()
+
+    def _start_editing(self):
+        if self._tf is not None:
+            return
+        idf = np.asarray(self.vectorizer.idf_)
+        # Rows are l2-normalised tf*idf, so dividing idf back out leaves rows
+        # proportional to the raw counts, which is all re-weighting needs.
+        inverse = np.divide(1.0, idf, out=np.zeros_like(idf, dtype=np.float64), where=idf > 0)
+        self._tf = sparse.csr_matrix(self.q_matrix @ sparse.diags(inverse))
+        self._df = np.bincount(self._tf.indices, minlength=len(idf)).astype(np.float64)
+        if self.vectorizer_kind == "tfidf":
+            self._vocab = dict(self.vectorizer.vocabulary_)
+
+    def collision_stats(self):
+        """
+        Hashing mode only: how full the hashed feature space is. The number of
+        distinct tokens is estimated from bucket occupancy (linear counting),
+        since keeping the exact token set is what hashing mode avoids.
+        """
+        if self.vectorizer_kind != "hashing":
+            raise ValueError("collision_stats() is only available with vectorizer='hashing'.")
+        self.refresh()
+        n = self.n_features
+        used = int(np.count_nonzero(np.diff(self.index.postings.indptr)))
+        est_terms = float(n * -np.log1p(-used / n)) if used < n else float("inf")
+        return {
+            "n_features": n,
+            "buckets_used": used,
+            "load_factor": used / n,
+            "est_distinct_terms": est_terms,
+            "est_colliding_terms": est_terms - used,
+        }
+
+    # -----------------------------
+    # Persistence
+    # -----------------------------
+    def save(self, path):
+        """
+        Write the fitted index (vocabulary, idf, CSR q_matrix and reply texts)
+        to `path` in the versioned binary layout described by INDEX_MAGIC.
+        """
+        with self._edit_lock:  # one consistent state, even with edits in other threads
+            self.refresh()
+            q = self.q_matrix.tocsr()
+            postings = self.index.postings
+            arrays = {
+                "idf": np.ascontiguousarray(self.vectorizer.idf_),
+                "data": np.ascontiguousarray(q.data),
+                "indices": np.ascontiguousarray(q.indices),
+                "indptr": np.ascontiguousarray(q.indptr),
+                "post_data": np.ascontiguousarray(postings.data),
+                "post_indices": np.ascontiguousarray(postings.indices),
+                "post_indptr": np.ascontiguousarray(postings.indptr),
+            }
+            header = {
+                "mode": self.mode,
+                "analyzer": getattr(self.analyzer, "__name__", type(self.analyzer).__name__),
+                "shape": list(q.shape),
+                "vectorizer": self.vectorizer_kind,
+                "n_features": self.n_features,
+                "vocabulary": (self.vectorizer.get_feature_names_out().tolist()
+                               if self.vectorizer_kind == "tfidf" else []),
+                "texts": self.answers if self.mode == "qa" else self.sentences,
+                "questions": self.questions if self.mode == "qa" else [],
+                "removed": np.flatnonzero(~self._live).tolist(),
+                "arrays": {},
+            }
+        # Offsets depend on the header size, which depends on the offsets:
+        # lay the arrays out after a generous guess and grow it until stable.
+        reserve = 0
+        while True:
+            offset = _aligned(_PREAMBLE.size + reserve)
+            for name, arr in arrays.items():
+                header["arrays"][name] = {"dtype": arr.dtype.str, "shape": list(arr.shape), "offset": offset}
+                offset = _aligned(offset + arr.nbytes)
+            blob = json.dumps(header, ensure_ascii=False).encode("utf-8")
+            if len(blob) <= reserve:
+                break
+            reserve = len(blob) + 256
+
+        # Write a temporary file next to `path` and swap it in: the arrays may be
+        # memory-mapped from `path` itself (load() then save() to the same file),
+        # and a crash mid-write must not leave a half-written index behind.
+        path = os.fspath(path)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)),
+                                        prefix=os.path.basename(path) + ".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(_PREAMBLE.pack(INDEX_MAGIC, INDEX_VERSION, len(blob)))
+                f.write(blob)
+                for name, arr in arrays.items():
+                    f.seek(header["arrays"][name]["offset"])
+                    f.write(arr.tobytes())
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    @classmethod
+    def load(cls, path, mmap: bool = True, analyzer=None, token_cache_size: int = 0,
+             reply_cache_size: int = 0, reply_cache_ttl=None, profile=None, ann: bool = False):
+        """
+        Load an index written by save(). With mmap=True the idf and CSR arrays
+        are memory-mapped read-only, so processes loading the same file share
+        its pages instead of each holding a private copy. An index built with a
+        custom analyzer must be loaded with that same analyzer.
+        """
+        with open(path, "rb") as f:
+            magic, version, header_len = _PREAMBLE.unpack(f.read(_PREAMBLE.size))
+            if magic != INDEX_MAGIC:
+                raise ValueError(f"{path} is not a SimpleChatbot index")
+            if version not in (1, INDEX_VERSION):
+                raise ValueError(f"Unsupported index version {version} (expected {INDEX_VERSION})")
+            header = json.loads(f.read(header_len).decode("utf-8"))
+
+            arrays = {}
+            for name, spec in header["arrays"].items():
+                dtype, shape = np.dtype(spec["dtype"]), tuple(spec["shape"])
+                if mmap:
+                    arrays[name] = np.memmap(path, dtype=dtype, mode="r", offset=spec["offset"], shape=shape)
+                else:
+                    f.seek(spec["offset"])
+                    arrays[name] = np.fromfile(f, dtype=dtype, count=int(np.prod(shape))).reshape(shape)
+
+        saved_analyzer = header.get("analyzer", "simple_analyzer")
+        if analyzer is None and saved_analyzer != "simple_analyzer":
+            raise ValueError(f"{path} was built with analyzer {saved_analyzer!r}; pass it to load().")
+
+        bot = cls.__new__(cls)
+        bot._set_profiler(profile)
+        bot._set_analyzer(analyzer, token_cache_size)
+        bot._set_reply_cache(reply_cache_size, reply_cache_ttl)
+        bot.mode = header["mode"]
+        if bot.mode == "qa":
+            bot.questions = header["questions"]
+            bot.answers = header["texts"]
+        else:
+            bot.sentences = header["texts"]
+        bot._set_vectorizer_kind(header.get("vectorizer", "tfidf"), header.get("n_features", 2 ** 20))
+        if bot.vectorizer_kind == "hashing":
+            bot.vectorizer = HashingTfidfVectorizer(bot.query_analyzer, bot.n_features)
+            bot.vectorizer.idf_ = arrays["idf"]
+        else:
+            bot.vectorizer = _make_vectorizer({term: i for i, term in enumerate(header["vocabulary"])},
+                                              arrays["idf"], bot.query_analyzer)
+        bot.q_matrix = sparse.csr_matrix((arrays["data"], arrays["indices"], arrays["indptr"]),
+                                         shape=tuple(header["shape"]), copy=False)
+        if "post_data" in arrays:
+            bot.index = InvertedIndex(sparse.csc_matrix(
+                (arrays["post_data"], arrays["post_indices"], arrays["post_indptr"]),
+                shape=tuple(header["shape"]), copy=False))
+        else:
+            bot.index = InvertedIndex.from_rows(bot.q_matrix)
+        bot.ann = None
+        bot._init_edit_state(bot.q_matrix.shape[0], header.get("removed", ()))
+        if ann:  # not stored in the file: built from the loaded rows
+            bot.enable_ann()
+        return bot
+
     @staticmethod
     def _split_sentences(text: str):
         text = re.sub(r"\s+", " ", text.strip())
@@ -0,0 +1,117 @@
+# google_client.py — pooled, rate-limited client for the Google Web Speech endpoint
+import http.client
+import queue
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import speech_recognition as sr
+from speech_recognition.recognizers.google import ENDPOINT, OutputParser, create_request_builder
+
+
+class _Retryable(sr.RequestError):
+    """A RequestError worth retrying: connection failures, 429 and 5xx."""
+
+
+class GoogleWebSpeechClient:
+    """
+    Same request/response format as Recognizer.recognize_google, but:
+    - HTTP keep-alive connections are pooled and reused across calls, so a
+      chunk doesn't pay connection (and TLS) setup every time;
+    - at most `max_concurrency` requests are in flight per client (register
+      one client per process to get a per-process cap);
+    - failures that may be transient are retried up to `retries` times with
+      full-jitter exponential backoff, starting from `backoff` seconds;
+    - with a `preprocessor` (an AudioPreprocessor), audio is downsampled
+      before FLAC encoding, so fewer bytes go over the wire.
+
+    `endpoint` can point at a local stand-in server for tests.
+    """
+    def __init__(self, endpoint: str = ENDPOINT, key=None, max_concurrency: int = 4,
+                 retries: int = 2, backoff: float = 0.25, timeout: float = 10.0, preprocessor=None):
+        self.endpoint = endpoint
+        self.preprocessor = preprocessor
+        self.key = key
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        url = urlsplit(endpoint)
+        self._conn_class = http.client.HTTPSConnection if url.scheme == "https" else http.client.HTTPConnection
+        self._host, self._port = url.hostname, url.port
+        self._idle = queue.LifoQueue()  # most recently used first: least likely to have timed out
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self.requests = 0
+        self.connections_opened = 0
+        self.retried = 0
+
+    def recognize(self, audio: sr.AudioData, language: str = "en-US") -> str:
+        builder = create_request_builder(endpoint=self.endpoint, key=self.key, language=language)
+        url = urlsplit(builder.build_url())
+        path = f"{url.path}?{url.query}"
+        if self.preprocessor is not None:
+            audio, body = self.preprocessor.encode(audio)
+        else:
+            body = builder.build_data(audio)
+        headers = builder.build_headers(audio)
+
+        for attempt in range(self.retries + 1):
+            try:
+                with self._slots:
+                    response_text = self._post(path, body, headers)
+                break
+            except _Retryable:
+                if attempt == self.retries:
+                    raise
+                self.retried += 1
+                time.sleep(random.uniform(0, self.backoff * 2 ** attempt))
+        return OutputParser(show_all=False, with_confidence=False).parse(response_text)
+
+    def _post(self, path: str, body: bytes, headers) -> str:
+        conn, reused = self._checkout()
+        try:
+            response, data = self._exchange(conn, path, body, headers)
+        except _Retryable:
+            if not reused:
+                raise
+            # The server probably dropped the idle connection: retry once on a new one.
+            conn = self._connect()
+            response, data = self._exchange(conn, path, body, headers)
+
+        self.requests += 1
+        if response.will_close:
+            conn.close()
+        else:
+            self._idle.put(conn)
+        if response.status == 429 or response.status >= 500:
+            raise _Retryable(f"recognition request failed: {response.reason}")
+        if response.status >= 400:
+            raise sr.RequestError(f"recognition request failed: {response.reason}")
+        return data.decode("utf-8")
+
+    @staticmethod
+    def _exchange(conn, path, body, headers):
+        try:
+            conn.request("POST", path, body=body, headers=headers)
+            response = conn.getresponse()
+            return response, response.read()
+        except (OSError, http.client.HTTPException) as e:
+            conn.close()
+            raise _Retryable(f"recognition connection failed: {e}")
+
+    def _checkout(self):
+        try:
+            return self._idle.get_nowait(), True
+        except queue.Empty:
+            return self._connect(), False
+
+    def _connect(self):
+        self.connections_opened += 1
+        return self._conn_class(self._host, self._port, timeout=self.timeout)
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
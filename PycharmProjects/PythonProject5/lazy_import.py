@@ -0,0 +1,26 @@
+# lazy_import.py — defer heavy scientific imports until a module is first used
+import importlib
+
+
+class LazyModule:
+    """
+    Placeholder for `import name as alias` that imports the module on first
+    attribute access, so importing our modules stays cheap and the cost is
+    paid by whichever call needs the library first. Attributes are copied onto
+    the placeholder as they are used, so later lookups skip __getattr__.
+    """
+    def __init__(self, name: str):
+        self.__dict__["_name"] = name
+        self.__dict__["_module"] = None
+
+    def __getattr__(self, attr):
+        module = self._module
+        if module is None:
+            module = self.__dict__["_module"] = importlib.import_module(self._name)
+        value = getattr(module, attr)
+        self.__dict__[attr] = value
+        return value
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module {self._name!r} ({state})>"
@@ -0,0 +1,185 @@
+# profiling.py — opt-in cProfile/tracemalloc capture for SimpleChatbot, dumped as diffable JSON
+# Enable with SimpleChatbot(..., profile="prof_dir") or CHATBOT_PROFILE=prof_dir
+# (CHATBOT_PROFILE_EVERY=N profiles one reply() in N, default 20). Each bot dumps into
+# its own prof_dir/<pid>-<n>/ subdirectory, so bots and worker processes don't collide.
+# Compare two dumps: python profiling.py old/1234-0/profile.json new/5678-0/profile.json
+import contextlib
+import cProfile
+import itertools
+import json
+import os
+import pstats
+import sys
+import sysconfig
+import threading
+import time
+import tracemalloc
+
+PROFILE_ENV = "CHATBOT_PROFILE"
+PROFILE_EVERY_ENV = "CHATBOT_PROFILE_EVERY"
+
+_STDLIB = sysconfig.get_paths()["stdlib"]
+_instances = itertools.count()  # numbers the per-instance dump directories in this process
+
+
+def _short_path(filename: str) -> str:
+    """Paths without the install prefix, so dumps from different machines line up."""
+    for marker in ("site-packages" + os.sep, "dist-packages" + os.sep):
+        if marker in filename:
+            return filename.split(marker, 1)[1]
+    if filename.startswith(_STDLIB):
+        return os.path.relpath(filename, _STDLIB)
+    return os.path.basename(filename) if os.path.isabs(filename) else filename
+
+
+class Profiler:
+    """
+    Profiles labelled blocks ("init", "reply", ...) with cProfile and
+    tracemalloc. cProfile stats accumulate per label over all profiled calls;
+    tracemalloc runs only inside a profiled block (started and stopped
+    around it unless something else is already tracing). tracemalloc can
+    only report the peak as a number, so for the block with the highest peak
+    the sites kept are those of the memory it still holds when it returns.
+
+    After every profiled block, `out_dir` gets `<label>.prof` (raw pstats, for
+    snakeviz and friends) and `profile.json`: per label the call count, wall
+    time, peak traced memory, the `top` functions by cumulative time and the
+    `top` sites of memory retained by the block, with install prefixes stripped and keys sorted so
+    two releases' dumps diff cleanly.
+
+    Only one block is profiled at a time; a concurrent call runs unprofiled.
+    """
+    def __init__(self, out_dir: str, sample_every: int = 20, top: int = 40):
+        self.out_dir = out_dir
+        self.sample_every = max(1, sample_every)
+        self.top = top
+        self._calls = itertools.count()
+        self._busy = threading.Lock()
+        self._stats = {}    # label -> accumulated pstats.Stats
+        self._summary = {}  # label -> calls, wall time, peak, retained allocations
+        os.makedirs(out_dir, exist_ok=True)
+
+    @classmethod
+    def from_setting(cls, profile=None):
+        """
+        A Profiler from a constructor argument: an instance is used as is, a
+        string is the output directory, False disables profiling and None
+        falls back to the CHATBOT_PROFILE environment variable. A directory
+        setting is shared by every bot (and process) configured with it, so
+        each Profiler made here writes to a `<pid>-<n>` subdirectory of it.
+        """
+        if isinstance(profile, Profiler):
+            return profile
+        if profile is None:
+            profile = os.environ.get(PROFILE_ENV) or False
+        if not profile:
+            return None
+        out_dir = os.path.join(profile, f"{os.getpid()}-{next(_instances)}")
+        return cls(out_dir, sample_every=int(os.environ.get(PROFILE_EVERY_ENV, "20")))
+
+    def sample(self) -> bool:
+        """True for one call in `sample_every`, starting with the first."""
+        return next(self._calls) % self.sample_every == 0
+
+    @contextlib.contextmanager
+    def profile(self, label: str):
+        if not self._busy.acquire(blocking=False):
+            yield
+            return
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+            baseline = None
+        else:
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.take_snapshot()  # only count what the block itself keeps
+        base, _ = tracemalloc.get_traced_memory()
+        prof = cProfile.Profile()
+        t0 = time.perf_counter()
+        prof.enable()
+        try:
+            yield
+        finally:
+            prof.disable()
+            wall = time.perf_counter() - t0
+            peak = tracemalloc.get_traced_memory()[1] - base
+            summary = self._summary.setdefault(label, {"calls": 0, "wall_s": 0.0, "peak_bytes": -1})
+            retained = None
+            if peak > summary["peak_bytes"]:
+                snapshot = tracemalloc.take_snapshot()
+                if baseline is None:
+                    retained = [(s.traceback[0], s.size, s.count) for s in snapshot.statistics("lineno")]
+                else:
+                    retained = [(s.traceback[0], s.size_diff, s.count_diff)
+                                for s in snapshot.compare_to(baseline, "lineno") if s.size_diff > 0]
+            if started_tracing:
+                tracemalloc.stop()
+            try:
+                self._add(label, prof, wall, peak, retained)
+                self.dump()
+            finally:
+                self._busy.release()
+
+    def _add(self, label, prof, wall, peak, retained):
+        if label in self._stats:
+            self._stats[label].add(prof)
+        else:
+            self._stats[label] = pstats.Stats(prof)
+        summary = self._summary[label]
+        summary["calls"] += 1
+        summary["wall_s"] += wall
+        if retained is not None:
+            summary["peak_bytes"] = peak
+            summary["retained_allocations"] = [
+                {"where": f"{_short_path(frame.filename)}:{frame.lineno}", "size_bytes": size, "count": count}
+                for frame, size, count in retained[:self.top]
+            ]
+
+    def _functions(self, stats: pstats.Stats):
+        rows = []
+        for (filename, lineno, name), (_, ncalls, tottime, cumtime, _) in stats.stats.items():
+            where = name if filename == "~" else f"{_short_path(filename)}:{name}"
+            rows.append({"function": where, "ncalls": ncalls,
+                         "tottime_ms": round(tottime * 1000, 3), "cumtime_ms": round(cumtime * 1000, 3)})
+        rows.sort(key=lambda r: (-r["cumtime_ms"], r["function"]))
+        return rows[:self.top]
+
+    def report(self):
+        labels = {}
+        for label, summary in self._summary.items():
+            labels[label] = {
+                "calls": summary["calls"],
+                "wall_ms_total": round(summary["wall_s"] * 1000, 3),
+                "wall_ms_mean": round(summary["wall_s"] * 1000 / summary["calls"], 3),
+                "peak_bytes_max": summary["peak_bytes"],
+                "functions": self._functions(self._stats[label]),
+                "retained_allocations": summary.get("retained_allocations", []),
+            }
+        return {"python": sys.version.split()[0], "sample_every": self.sample_every, "labels": labels}
+
+    def dump(self):
+        for label, stats in self._stats.items():
+            stats.dump_stats(os.path.join(self.out_dir, f"{label}.prof"))
+        with open(os.path.join(self.out_dir, "profile.json"), "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, indent=1, sort_keys=True)
+
+
+def compare(old: dict, new: dict, top: int = 15):
+    """Print per-label wall/peak changes and the functions whose mean cumulative time moved most."""
+    for label in sorted(set(old["labels"]) & set(new["labels"])):
+        a, b = old["labels"][label], new["labels"][label]
+        print(f"[{label}] wall/call {a['wall_ms_mean']:.2f} -> {b['wall_ms_mean']:.2f} ms, "
+              f"peak {a['peak_bytes_max'] / 1024:.0f} -> {b['peak_bytes_max'] / 1024:.0f} KiB")
+        per_call_a = {f["function"]: f["cumtime_ms"] / a["calls"] for f in a["functions"]}
+        per_call_b = {f["function"]: f["cumtime_ms"] / b["calls"] for f in b["functions"]}
+        deltas = sorted(((per_call_b.get(fn, 0.0) - per_call_a.get(fn, 0.0), fn)
+                         for fn in set(per_call_a) | set(per_call_b)), key=lambda d: -abs(d[0]))
+        for delta, fn in deltas[:top]:
+            print(f"  {delta:+10.3f} ms/call  {fn}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        sys.exit("usage: python profiling.py OLD/<pid>-<n>/profile.json NEW/<pid>-<n>/profile.json")
+    with open(sys.argv[1], encoding="utf-8") as f_old, open(sys.argv[2], encoding="utf-8") as f_new:
+        compare(json.load(f_old), json.load(f_new))
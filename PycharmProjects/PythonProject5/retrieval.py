@@ -0,0 +1,109 @@
+# retrieval.py — top-k scoring over L2-normalised TF-IDF rows without dense similarity vectors
+from lazy_import import LazyModule
+
+np = LazyModule("numpy")
+sparse = LazyModule("scipy.sparse")
+
+
+def top_k(scores, k: int):
+    """
+    Positions of the k largest `scores`, best first, using a partial selection
+    instead of a full sort. Equal scores keep the lower position first.
+    """
+    n = len(scores)
+    if n == 0 or k <= 0:
+        return np.empty(0, dtype=np.intp)
+    if k == 1:
+        return np.array([int(np.argmax(scores))], dtype=np.intp)
+    if k < n:
+        picked = _with_ties(scores, np.arange(n), np.argpartition(-scores, k - 1)[k - 1], k)
+    else:
+        picked = np.arange(n)
+    return picked[np.lexsort((picked, -scores[picked]))]
+
+
+def _with_ties(scores, keys, kth, k: int):
+    """
+    The k positions of `scores` to keep, given the position `kth` of the k-th
+    largest: everything scoring above it, then the ties at the cut with the
+    lowest `keys` (argpartition alone picks among those arbitrarily).
+    """
+    cut = scores[kth]
+    above = np.flatnonzero(scores > cut)
+    ties = np.flatnonzero(scores == cut)
+    ties = ties[np.argsort(keys[ties], kind="stable")[:k - len(above)]]
+    return np.concatenate([above, ties])
+
+
+class InvertedIndex:
+    """
+    Term -> postings view (CSC layout) of a row-normalised document matrix.
+    Since rows and queries are unit length, cosine similarity is a plain dot
+    product, and scoring a query only has to walk the postings of its terms.
+    """
+    def __init__(self, postings):
+        self.postings = sparse.csc_matrix(postings)
+        self.n_docs = self.postings.shape[0]
+
+    @classmethod
+    def from_rows(cls, matrix):
+        return cls(sparse.csr_matrix(matrix).tocsc())
+
+    def search(self, query_vec, k: int = 1):
+        """Return up to k (row, score) pairs with a non-zero score, best first."""
+        q = sparse.csr_matrix(query_vec)
+        terms, weights = q.indices, q.data
+        indptr = self.postings.indptr
+        starts, ends = indptr[terms], indptr[terms + 1]
+        lengths = ends - starts
+        total = int(lengths.sum())
+        if total == 0:
+            return []
+
+        # Flat positions of every posting of every query term, in one pass.
+        shift = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+        pos = shift + np.arange(total)
+        rows = self.postings.indices[pos]
+        contrib = self.postings.data[pos] * np.repeat(weights, lengths)
+
+        candidates, inverse = np.unique(rows, return_inverse=True)
+        scores = np.bincount(inverse.ravel(), weights=contrib, minlength=len(candidates))
+        return [(int(candidates[i]), float(scores[i])) for i in top_k(scores, k)]
+
+
+def top_k_rows(sims, k: int):
+    """
+    Row-wise top-k of a sparse (queries x docs) score matrix. Returns one list
+    of (doc, score) pairs per row, best first, skipping zero scores. Each row's
+    segment gets its own partial selection (a plain argmax for k=1), so the
+    cost is linear in the non-zeros rather than a sort of all of them; equal
+    scores keep the lower doc first.
+    """
+    sims = sparse.csr_matrix(sims)
+    sims.eliminate_zeros()
+    n_rows = sims.shape[0]
+    results = [[] for _ in range(n_rows)]
+    if k <= 0 or sims.nnz == 0:
+        return results
+    counts = np.diff(sims.indptr)
+    filled = np.flatnonzero(counts)
+    starts = sims.indptr[filled]
+
+    if k == 1:
+        best = np.maximum.reduceat(sims.data, starts)
+        # Lowest doc among each row's maxima: non-maxima are masked out with n_docs
+        is_best = sims.data == np.repeat(best, counts[filled])
+        docs = np.minimum.reduceat(np.where(is_best, sims.indices, sims.shape[1]), starts)
+        for row, doc, score in zip(filled.tolist(), docs.tolist(), best.tolist()):
+            results[row].append((doc, score))
+        return results
+
+    for row, start, end in zip(filled.tolist(), starts.tolist(), sims.indptr[filled + 1].tolist()):
+        data, docs = sims.data[start:end], sims.indices[start:end]
+        if end - start > k:
+            picked = _with_ties(data, docs, np.argpartition(-data, k - 1)[k - 1], k)
+        else:
+            picked = np.arange(end - start)
+        picked = picked[np.lexsort((docs[picked], -data[picked]))]
+        results[row] = list(zip(docs[picked].tolist(), data[picked].tolist()))
+    return results
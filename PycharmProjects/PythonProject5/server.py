@@ -0,0 +1,189 @@
+# server.py — headless HTTP/WebSocket API around one shared SimpleChatbot and the voice pipeline
+# Usage: python server.py [--corpus corpus.txt | --index bot.idx] [--host 0.0.0.0] [--port 8080]
+#        [--engine "Google Web Speech"] [--fixtures DIR]
+#
+# POST /reply   {"text": "..."}            -> {"reply": "...", "score": 0.87}
+#               {"texts": ["...", "..."]}  -> {"results": [{"reply": ..., "score": ...}, ...]}
+# GET  /health                             -> {"status": "ok", ...}
+# WS   /stream  first message (optional, text): {"sample_rate": 16000, "language": "en-US"}
+#               then binary messages of 16-bit mono PCM, and {"type": "end"} when done.
+#               The server sends {"type": "turn", ...} per recognised phrase and a final
+#               {"type": "final", "transcript": ...} before closing.
+import argparse
+import asyncio
+import functools
+import json
+
+import speech_recognition as sr
+from aiohttp import WSMsgType, web
+
+from asr_backends import FixtureBackend, get_backend, register_backend
+from audio_capture import NoiseCalibrator, RingBufferSource
+from chatbot import SimpleChatbot
+from vad import VoiceActivityDetector
+from voice_pipeline import VoicePipeline
+
+CHUNK = 1024                # frames per block handed to Recognizer.listen()
+STREAM_BUFFER_SECONDS = 30  # PCM a client may send ahead of recognition
+POLL_SEC = 0.05
+
+
+def load_bot(corpus=None, index=None) -> SimpleChatbot:
+    if index:
+        return SimpleChatbot.load(index, mmap=True, token_cache_size=4096, reply_cache_size=4096)
+    with open(corpus, "r", encoding="utf-8") as f:
+        return SimpleChatbot(f.read(), token_cache_size=4096, reply_cache_size=4096)
+
+
+async def handle_reply(request):
+    bot = request.app["bot"]
+    try:
+        payload = await request.json()
+    except ValueError:
+        raise web.HTTPBadRequest(text="body must be JSON")
+    loop = asyncio.get_running_loop()
+
+    # Scoring is CPU-bound: keep it off the event loop
+    if isinstance(payload, dict) and isinstance(payload.get("texts"), list):
+        pairs = await loop.run_in_executor(None, bot.reply_many, [str(t or "") for t in payload["texts"]])
+        return web.json_response({"results": [{"reply": a, "score": s} for a, s in pairs]})
+    if isinstance(payload, dict) and "text" in payload:
+        (reply, score), = await loop.run_in_executor(None, bot.reply_many, [str(payload["text"] or "")])
+        return web.json_response({"reply": reply, "score": score})
+    raise web.HTTPBadRequest(text='expected {"text": ...} or {"texts": [...]}')
+
+
+async def handle_health(request):
+    bot = request.app["bot"]
+    cache = bot.reply_cache.stats() if bot.reply_cache is not None else None
+    return web.json_response({"status": "ok", "rows": bot.q_matrix.shape[0], "reply_cache": cache})
+
+
+def recognize(backend, language, audio):
+    try:
+        return backend.recognize(audio, language)
+    except sr.UnknownValueError:
+        return ""
+
+
+async def handle_stream(request):
+    """Streamed PCM in, one message per recognised phrase out."""
+    app = request.app
+    ws = web.WebSocketResponse()
+    await ws.prepare(request)
+
+    sample_rate, language = 16000, app["language"]
+    source = calibrator = pipeline = None
+    pending = b""
+    transcript = []
+
+    async def forward_turns():
+        for turn in pipeline.drain():
+            if turn.text:
+                transcript.append(turn.text)
+            await ws.send_json({"type": "turn", "seq": turn.seq, "transcript": turn.text,
+                                "reply": turn.reply, "error": turn.error})
+
+    async def poll():
+        while not ws.closed:
+            await asyncio.sleep(POLL_SEC)
+            await forward_turns()
+
+    poller = None
+    try:
+        async for msg in ws:
+            if msg.type == WSMsgType.TEXT:
+                try:
+                    control = json.loads(msg.data)
+                except ValueError:
+                    control = None
+                if not isinstance(control, dict):
+                    await ws.send_json({"type": "error", "error": "control messages must be JSON objects"})
+                    continue
+                if control.get("type") == "end":
+                    break
+                if source is None:  # configuration is only accepted before the audio
+                    rate = control.get("sample_rate", sample_rate)
+                    lang = control.get("language", language)
+                    if type(rate) is not int or rate <= 0:
+                        await ws.send_json({"type": "error", "error": "sample_rate must be a positive integer"})
+                    elif not isinstance(lang, str) or not lang:
+                        await ws.send_json({"type": "error", "error": "language must be a non-empty string"})
+                    else:
+                        sample_rate, language = rate, lang
+                continue
+            if msg.type != WSMsgType.BINARY:
+                break
+
+            if source is None:
+                source = RingBufferSource(sample_rate, 2, CHUNK, STREAM_BUFFER_SECONDS * sample_rate // CHUNK)
+                calibrator = NoiseCalibrator()
+                pipeline = VoicePipeline(
+                    source, sr.Recognizer(),
+                    transcribe=functools.partial(recognize, app["backend"], language),
+                    reply=app["bot"].reply,
+                    energy_threshold=lambda: calibrator.energy_threshold,
+                    vad=VoiceActivityDetector(noise_floor=lambda: calibrator.noise_level),
+                ).start()
+                poller = asyncio.ensure_future(poll())
+
+            # Re-block arbitrary client frames into CHUNK-sized blocks
+            # (walking an offset: slicing off each block would re-copy the rest every time)
+            pending += msg.data
+            block_bytes = CHUNK * 2
+            view, offset = memoryview(pending), 0
+            while len(pending) - offset >= block_bytes:
+                block = bytes(view[offset:offset + block_bytes])
+                offset += block_bytes
+                calibrator.update(block, CHUNK / sample_rate)
+                source.write(block)
+            view.release()
+            pending = pending[offset:]
+    finally:
+        if pipeline is not None:
+            if pending:
+                source.write(pending)
+            source.close()
+            poller.cancel()
+            if ws.closed:
+                pipeline.stop()  # client is gone: don't recognise what's still queued
+            else:
+                await asyncio.get_running_loop().run_in_executor(None, pipeline.join)
+            if not ws.closed:
+                await forward_turns()
+                await ws.send_json({"type": "final", "transcript": " ".join(transcript)})
+        if not ws.closed:
+            await ws.close()
+    return ws
+
+
+def make_app(bot: SimpleChatbot, backend, language: str = "en-US") -> web.Application:
+    app = web.Application(client_max_size=8 * 1024 * 1024)
+    app["bot"] = bot
+    app["backend"] = backend
+    app["language"] = language
+    app.router.add_post("/reply", handle_reply)
+    app.router.add_get("/health", handle_health)
+    app.router.add_get("/stream", handle_stream)
+    return app
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Serve the FAQ bot and voice pipeline over HTTP/WebSocket.")
+    ap.add_argument("--corpus", default="corpus.txt")
+    ap.add_argument("--index", help="prebuilt SimpleChatbot index (see SimpleChatbot.save); overrides --corpus")
+    ap.add_argument("--host", default="0.0.0.0")
+    ap.add_argument("--port", type=int, default=8080)
+    ap.add_argument("--engine", default="Google Web Speech", help="recognition backend name")
+    ap.add_argument("--language", default="en-US")
+    ap.add_argument("--fixtures", help="register the offline fixture backend from this directory")
+    args = ap.parse_args(argv)
+
+    if args.fixtures:
+        register_backend(FixtureBackend(args.fixtures))
+    bot = load_bot(args.corpus, args.index)
+    web.run_app(make_app(bot, get_backend(args.engine), args.language), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
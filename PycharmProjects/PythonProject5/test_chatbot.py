@@ -0,0 +1,163 @@
+# test_chatbot.py — index edits, persistence and reply parity with the original dense scoring
+# Run: python -m pytest -q
+import json
+import threading
+
+import numpy as np
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics.pairwise import cosine_similarity
+
+import chatbot
+from chatbot import SimpleChatbot, simple_analyzer
+
+PAIRS = [
+    ("What are your opening hours?", "We are open 9 to 5."),
+    ("Where is the office?", "Main street 12."),
+    ("How do I reset my password?", "Use the forgot password link."),
+    ("Do you ship abroad?", "Yes, to most countries."),
+    ("How much does shipping cost?", "Shipping is free over 50 euros."),
+    ("Can I return an item?", "Returns are accepted within 30 days."),
+    ("Who do I contact for support?", "Write to support at example dot com."),
+    ("Is there a student discount?", "Students get 10 percent off."),
+]
+EXTRA = [
+    ("Do you have gift cards?", "Gift cards are sold in store."),
+    ("How do I change my shipping address?", "Edit it under account settings."),
+    ("Are pets allowed in the office?", "Only guide dogs, sorry."),
+]
+QUERIES = ["opening hours", "reset password", "shipping cost abroad", "gift cards",
+           "pets in the office", "student discount please", "change address", "unrelated words"]
+
+
+def corpus(pairs):
+    return "\n\n".join(f"Q: {q}\nA: {a}" for q, a in pairs)
+
+
+def scores(bot, k=20):
+    return [dict(bot.search(q, k=k)) for q in QUERIES]
+
+
+def assert_same_scores(got, expected, id_map):
+    """`got` from an edited bot, `expected` from a rebuilt one; id_map: edited id -> rebuilt id."""
+    for g, e in zip(got, expected):
+        assert {id_map[i]: s for i, s in g.items()} == pytest.approx(e)
+
+
+@pytest.mark.parametrize("vectorizer", ["tfidf", "hashing"])
+def test_add_remove_matches_full_rebuild(vectorizer):
+    bot = SimpleChatbot(corpus(PAIRS), vectorizer=vectorizer)
+    added = bot.add_pairs([q for q, _ in EXTRA], [a for _, a in EXTRA])
+    assert added == list(range(len(PAIRS), len(PAIRS) + len(EXTRA)))
+    removed = [1, 4, added[0]]
+    bot.remove(removed)
+
+    everything = PAIRS + EXTRA
+    kept = [i for i in range(len(everything)) if i not in removed]
+    rebuilt = SimpleChatbot(corpus([everything[i] for i in kept]), vectorizer=vectorizer)
+    assert_same_scores(scores(bot), scores(rebuilt), {old: new for new, old in enumerate(kept)})
+    assert all(i not in hits for hits in scores(bot) for i in removed)
+
+
+def test_save_load_round_trip_keeps_removed_ids(tmp_path):
+    bot = SimpleChatbot(corpus(PAIRS))
+    bot.add_pairs([q for q, _ in EXTRA], [a for _, a in EXTRA])
+    bot.remove([2, 9])
+    path = tmp_path / "bot.idx"
+    bot.save(path)
+
+    for mmap in (True, False):
+        loaded = SimpleChatbot.load(path, mmap=mmap)
+        assert scores(loaded) == [pytest.approx(s) for s in scores(bot)]
+        assert [loaded.reply(q) for q in QUERIES] == [bot.reply(q) for q in QUERIES]
+        assert np.flatnonzero(~loaded._live).tolist() == [2, 9]
+
+    # Saving over the file the arrays are memory-mapped from
+    SimpleChatbot.load(path, mmap=True).save(path)
+    resaved = SimpleChatbot.load(path)
+    assert scores(resaved) == [pytest.approx(s) for s in scores(bot)]
+    assert np.flatnonzero(~resaved._live).tolist() == [2, 9]
+
+    # Edits after loading from a read-only mapping still match a rebuild
+    loaded = SimpleChatbot.load(path, mmap=True)
+    loaded.remove([0])
+    everything = PAIRS + EXTRA
+    kept = [i for i in range(len(everything)) if i not in (0, 2, 9)]
+    rebuilt = SimpleChatbot(corpus([everything[i] for i in kept]))
+    assert_same_scores(scores(loaded), scores(rebuilt), {old: new for new, old in enumerate(kept)})
+
+
+def test_load_version_1_index(tmp_path):
+    bot = SimpleChatbot(corpus(PAIRS))
+    path = tmp_path / "v2.idx"
+    bot.save(path)
+
+    # A version-1 file is the same layout without the CSC postings arrays
+    raw = path.read_bytes()
+    magic, _, header_len = chatbot._PREAMBLE.unpack_from(raw)
+    header = json.loads(raw[chatbot._PREAMBLE.size:chatbot._PREAMBLE.size + header_len])
+    for name in [n for n in header["arrays"] if n.startswith("post_")]:
+        del header["arrays"][name]
+    del header["removed"]
+    blob = json.dumps(header).encode("utf-8")
+    assert len(blob) <= header_len  # array offsets are absolute, so a shorter header fits
+    v1 = tmp_path / "v1.idx"
+    v1.write_bytes(chatbot._PREAMBLE.pack(magic, 1, len(blob)) + blob
+                   + raw[chatbot._PREAMBLE.size + len(blob):])
+
+    loaded = SimpleChatbot.load(v1)
+    assert scores(loaded) == [pytest.approx(s) for s in scores(bot)]
+
+
+@pytest.mark.parametrize("reply_cache_size", [0, 16])
+def test_reply_matches_dense_cosine_baseline(reply_cache_size):
+    questions, answers = [q for q, _ in PAIRS], [a for _, a in PAIRS]
+    vectorizer = TfidfVectorizer(analyzer=simple_analyzer)
+    matrix = vectorizer.fit_transform(questions)
+    bot = SimpleChatbot(corpus(PAIRS), reply_cache_size=reply_cache_size)
+
+    for query in QUERIES + questions:
+        sims = cosine_similarity(vectorizer.transform([query]), matrix)[0]
+        best = int(np.argmax(sims))
+        expected = answers[best] if sims[best] >= 0.10 else "I'm not sure I understood. Could you rephrase?"
+        assert bot.reply(query) == expected
+    assert [r for r, _ in bot.reply_many(QUERIES)] == [bot.reply(q) for q in QUERIES]
+
+
+def test_reply_cache_skips_replies_from_a_replaced_index():
+    bot = SimpleChatbot(corpus(PAIRS), reply_cache_size=16)
+    search = bot.search
+
+    def search_then_edit(text, k=5):
+        hits = search(text, k)
+        bot.remove([0])  # another thread edits and refreshes mid-reply
+        bot.refresh()
+        return hits
+
+    bot.search = search_then_edit
+    assert bot.reply("what are your opening hours") == PAIRS[0][1]
+    del bot.search
+    assert bot.reply("what are your opening hours") != PAIRS[0][1]
+
+
+def test_edits_alongside_queries():
+    bot = SimpleChatbot(corpus(PAIRS))
+    errors = []
+
+    def ask():
+        try:
+            for _ in range(200):
+                bot.search("shipping gift cards office", k=3)
+        except Exception as exc:  # pragma: no cover - reported below
+            errors.append(exc)
+
+    readers = [threading.Thread(target=ask) for _ in range(4)]
+    for t in readers:
+        t.start()
+    for i in range(50):
+        ids = bot.add_pairs([f"new question {i} about gift cards"], [f"answer {i}"])
+        if i % 2:
+            bot.remove(ids)
+    for t in readers:
+        t.join()
+    assert not errors
@@ -0,0 +1,119 @@
+# test_google_client.py — GoogleWebSpeechClient against a local stand-in for the Web Speech endpoint
+# Run: python -m pytest -q
+import http.server
+import threading
+import time
+
+import pytest
+import speech_recognition as sr
+
+from google_client import GoogleWebSpeechClient
+
+TRANSCRIPT = ('{"result":[]}\n'
+              '{"result":[{"alternative":[{"transcript":"hello there","confidence":0.9}],"final":true}],'
+              '"result_index":0}\n')
+
+
+class StandIn(http.server.ThreadingHTTPServer):
+    """Answers every POST with `status` after `delay` seconds, keeping connections alive."""
+    daemon_threads = True
+
+    def __init__(self, status=200, delay=0.0):
+        super().__init__(("127.0.0.1", 0), Handler)
+        self.status = status
+        self.delay = delay
+        self.requests = 0
+        self.connections = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    @property
+    def endpoint(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/speech-api/v2/recognize"
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        time.sleep(server.delay)
+        with server.lock:
+            server.in_flight -= 1
+        body = TRANSCRIPT.encode("utf-8") if server.status == 200 else b"unavailable"
+        self.send_response(server.status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def serve():
+    servers = []
+
+    def start(**kwargs):
+        server = StandIn(**kwargs)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture(scope="module")
+def audio():
+    return sr.AudioData(b"\x00\x00" * 1600, 16000, 2)  # 0.1 s of silence
+
+
+def test_retries_on_503_then_gives_up(serve, audio):
+    server = serve(status=503)
+    client = GoogleWebSpeechClient(server.endpoint, retries=2, backoff=0.01)
+    with pytest.raises(sr.RequestError):
+        client.recognize(audio)
+    assert server.requests == 3
+    assert client.retried == 2
+    assert client.requests == 3
+    assert server.connections == client.connections_opened == 1  # 503s keep the connection
+    client.close()
+
+
+def test_reuses_one_connection(serve, audio):
+    server = serve()
+    client = GoogleWebSpeechClient(server.endpoint)
+    assert [client.recognize(audio) for _ in range(5)] == ["hello there"] * 5
+    assert server.requests == 5
+    assert server.connections == client.connections_opened == 1
+    client.close()
+
+
+def test_caps_concurrent_requests(serve, audio):
+    server = serve(delay=0.05)
+    client = GoogleWebSpeechClient(server.endpoint, max_concurrency=2)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(client.recognize(audio))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results == ["hello there"] * 8
+    assert server.max_in_flight == 2
+    assert client.connections_opened <= 2
+    client.close()
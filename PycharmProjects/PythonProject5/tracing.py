@@ -0,0 +1,98 @@
+# tracing.py — per-stage spans for voice turns, for attributing slow turns to a stage
+import collections
+import contextlib
+import json
+import math
+import threading
+import time
+
+# One timed stage. start/end are time.monotonic() seconds; `trace` identifies the
+# pipeline run and `turn` the phrase within it (both None for session-wide stages).
+Span = collections.namedtuple("Span", "name start end trace turn attrs")
+
+STAGES = ("calibration", "listen", "queue", "vad", "recognize", "reply", "rerun")
+
+
+def _percentile(sorted_values, q: float) -> float:
+    """Nearest-rank percentile of an already sorted, non-empty list."""
+    rank = max(0, math.ceil(q / 100 * len(sorted_values)) - 1)
+    return sorted_values[rank]
+
+
+class Tracer:
+    """
+    Thread-safe, bounded span recorder. Capture, pipeline workers and the UI
+    thread all record into one tracer; the newest `maxlen` spans are kept.
+    With `path`, every span is also appended to that file as a JSON line as
+    soon as it is recorded, so long sessions can be analysed offline.
+    """
+    def __init__(self, maxlen: int = 2000, path=None):
+        self.path = path
+        self._spans = collections.deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+
+    def record(self, name: str, start: float, end: float, trace=None, turn=None, **attrs) -> Span:
+        span = Span(name, start, end, trace, turn, attrs)
+        with self._lock:
+            self._spans.append(span)
+            if self.path:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(self._to_json(span) + "\n")
+        return span
+
+    @contextlib.contextmanager
+    def span(self, name: str, trace=None, turn=None, **attrs):
+        """Time the body of a `with` block as one span (recorded even if it raises)."""
+        start = time.monotonic()
+        try:
+            yield attrs  # the body may add attributes
+        finally:
+            self.record(name, start, time.monotonic(), trace, turn, **attrs)
+
+    def spans(self):
+        with self._lock:
+            return list(self._spans)
+
+    def clear(self):
+        with self._lock:
+            self._spans.clear()
+
+    def breakdown(self, last: int = 50):
+        """
+        Per stage, over its `last` most recent spans: count, mean, p50, p95
+        and max duration in milliseconds. Stages in STAGES order come first.
+        """
+        durations = collections.defaultdict(list)
+        for span in self.spans():
+            durations[span.name].append((span.end - span.start) * 1000)
+        names = [s for s in STAGES if s in durations] + sorted(set(durations) - set(STAGES))
+        rows = {}
+        for name in names:
+            values = sorted(durations[name][-last:])
+            rows[name] = {
+                "count": len(values),
+                "mean_ms": sum(values) / len(values),
+                "p50_ms": _percentile(values, 50),
+                "p95_ms": _percentile(values, 95),
+                "max_ms": values[-1],
+            }
+        return rows
+
+    def to_jsonl(self) -> str:
+        return "".join(self._to_json(span) + "\n" for span in self.spans())
+
+    def export(self, path: str) -> int:
+        """Write the retained spans to `path` as JSON lines; returns how many."""
+        spans = self.spans()
+        with open(path, "w", encoding="utf-8") as f:
+            for span in spans:
+                f.write(self._to_json(span) + "\n")
+        return len(spans)
+
+    @staticmethod
+    def _to_json(span: Span) -> str:
+        return json.dumps({
+            "name": span.name, "start": span.start, "end": span.end,
+            "duration_ms": round((span.end - span.start) * 1000, 3),
+            "trace": span.trace, "turn": span.turn, **span.attrs,
+        }, ensure_ascii=False, default=str)
@@ -0,0 +1,92 @@
+# vad.py — frame-level voice activity detection over raw PCM, before any recogniser runs
+import threading
+
+import numpy as np
+import speech_recognition as sr
+
+
+class VoiceActivityDetector:
+    """
+    Energy + zero-crossing-rate VAD computed with NumPy over 30 ms frames.
+
+    A frame counts as speech when its RMS energy is above both `min_energy`
+    and `energy_ratio` times the noise floor, and its zero-crossing rate is
+    below `max_zcr` (broadband hiss and clicks cross zero far more often than
+    voiced speech). The noise floor is the session's ambient level when
+    `noise_floor` (a zero-arg callable, e.g. NoiseCalibrator.noise_level) is
+    given. Otherwise it is the chunk's quietest frames, used only when they
+    are near `min_energy`: a chunk cut from continuous talk has no silence,
+    and its quietest frames are still speech. trim() cuts leading and
+    trailing silence, keeping `pad_ms` around the speech, and returns None
+    when there is less than `min_speech_ms` of speech, so noise bursts never
+    reach a recogniser. Counters record what was discarded.
+    """
+    def __init__(self, frame_ms: int = 30, min_energy: float = 300.0, energy_ratio: float = 2.0,
+                 max_zcr: float = 0.35, min_speech_ms: int = 150, pad_ms: int = 150, noise_floor=None):
+        self.frame_ms = frame_ms
+        self.min_energy = min_energy
+        self.energy_ratio = energy_ratio
+        self.max_zcr = max_zcr
+        self.min_speech_ms = min_speech_ms
+        self.pad_ms = pad_ms
+        self.noise_floor = noise_floor
+        self.chunks_seen = 0
+        self.chunks_dropped = 0
+        self.seconds_seen = 0.0
+        self.seconds_discarded = 0.0
+        self._lock = threading.Lock()
+
+    def speech_frames(self, samples: np.ndarray, sample_rate: int) -> np.ndarray:
+        """Boolean speech mask, one entry per frame of int16 `samples`."""
+        frame_len = max(1, sample_rate * self.frame_ms // 1000)
+        n_frames = len(samples) // frame_len
+        if n_frames == 0:
+            return np.zeros(0, dtype=bool)
+        frames = samples[:n_frames * frame_len].reshape(n_frames, frame_len).astype(np.float32)
+        energy = np.sqrt(np.mean(frames ** 2, axis=1))
+        signs = np.signbit(frames)
+        zcr = np.mean(signs[:, 1:] != signs[:, :-1], axis=1)
+        if self.noise_floor is not None:
+            floor = self.noise_floor()
+        else:
+            floor = np.percentile(energy, 10)
+            if floor >= self.min_energy * self.energy_ratio:
+                floor = 0.0  # no quiet frames in this chunk: min_energy alone decides
+        threshold = max(self.min_energy, floor * self.energy_ratio)
+        return (energy > threshold) & (zcr < self.max_zcr)
+
+    def trim(self, audio: sr.AudioData):
+        """Return `audio` with silence trimmed, or None if it holds no speech."""
+        rate = audio.sample_rate
+        pcm = audio.frame_data if audio.sample_width == 2 else audio.get_raw_data(convert_width=2)
+        samples = np.frombuffer(pcm, dtype=np.int16)
+        total = len(samples) / rate
+
+        speech = self.speech_frames(samples, rate)
+        frame_len = max(1, rate * self.frame_ms // 1000)
+        if speech.sum() * self.frame_ms < self.min_speech_ms:
+            self._count(total, total, dropped=True)
+            return None
+
+        hits = np.flatnonzero(speech)
+        pad = rate * self.pad_ms // 1000
+        start = max(0, hits[0] * frame_len - pad)
+        end = min(len(samples), (hits[-1] + 1) * frame_len + pad)
+        self._count(total, total - (end - start) / rate, dropped=False)
+        return sr.AudioData(samples[start:end].tobytes(), rate, 2)
+
+    def _count(self, seconds: float, discarded: float, dropped: bool):
+        with self._lock:
+            self.chunks_seen += 1
+            self.chunks_dropped += dropped
+            self.seconds_seen += float(seconds)
+            self.seconds_discarded += float(discarded)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "chunks_seen": self.chunks_seen,
+                "chunks_dropped": self.chunks_dropped,
+                "seconds_seen": self.seconds_seen,
+                "seconds_discarded": self.seconds_discarded,
+            }
@@ -0,0 +1,166 @@
+# voice_pipeline.py — capture, recognition and replies as overlapping stages
+import collections
+import contextlib
+import itertools
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import speech_recognition as sr
+
+# One finished voice turn. `error` is set (and text/reply are empty) when
+# recognition or the reply failed; `finished` is its time.monotonic() completion time.
+VoiceTurn = collections.namedtuple("VoiceTurn", "seq text reply error finished", defaults=(None,))
+
+
+class VoicePipeline:
+    """
+    Producer/consumer voice loop. A listener thread cuts phrases from `source`
+    with Recognizer.listen() and hands each AudioData to a pool of workers,
+    which run the optional `vad` (a VoiceActivityDetector, dropping phrases
+    with no speech), `transcribe(audio) -> text` and `reply(text) -> str`. While
+    chunk N is being recognised, chunk N+1 is already being captured, so the
+    turn rate is bounded by the slowest stage rather than the sum of them.
+
+    The UI thread collects finished turns with drain(), in the order the
+    phrases were heard. Nothing here touches Streamlit state.
+
+    With a `tracer` (tracing.Tracer), every turn records listen, queue, vad,
+    recognize and reply spans under this pipeline's `trace_id`.
+    """
+    def __init__(self, source, recognizer, transcribe, reply, workers: int = 2,
+                 max_pending: int = 8, phrase_time_limit=None, energy_threshold=None,
+                 poll_seconds: float = 1.0, vad=None, tracer=None):
+        self.source = source
+        self.recognizer = recognizer
+        self.transcribe = transcribe
+        self.reply = reply
+        self.phrase_time_limit = phrase_time_limit
+        self.energy_threshold = energy_threshold  # optional zero-arg callable
+        self.poll_seconds = poll_seconds
+        self.vad = vad
+        self.tracer = tracer
+        self.trace_id = uuid.uuid4().hex[:8]
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="asr")
+        self._slots = threading.BoundedSemaphore(max_pending)  # backpressure on the listener
+        self._seq = itertools.count()
+        self._done = {}
+        self._next = 0
+        self._issued = 0  # phrases handed to the workers so far
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._paused = threading.Event()
+        self._listener = None
+
+    @property
+    def running(self) -> bool:
+        return self._listener is not None and self._listener.is_alive()
+
+    @property
+    def finished(self) -> bool:
+        """True once the listener has exited and every phrase it heard has been drained."""
+        with self._lock:
+            return not self.running and self._next == self._issued
+
+    def start(self):
+        if not self.running:
+            self._stop.clear()
+            self._listener = threading.Thread(target=self._listen_loop, name="voice-listener", daemon=True)
+            self._listener.start()
+        return self
+
+    def pause(self):
+        self._paused.set()
+
+    def resume(self):
+        self._paused.clear()
+
+    def stop(self):
+        """
+        Stop listening without waiting; phrases already queued still finish and
+        can be drained (until `finished` is True).
+        """
+        self._stop.set()
+        self._paused.clear()
+        self._pool.shutdown(wait=False)
+
+    def join(self):
+        """Wait until the source is exhausted and every phrase has been processed (offline runs)."""
+        if self._listener is not None:
+            self._listener.join()
+        self._pool.shutdown(wait=True)
+
+    def _listen_loop(self):
+        r = self.recognizer
+        while not self._stop.is_set():
+            if self._paused.is_set():
+                self._stop.wait(0.1)
+                continue
+            if self.energy_threshold is not None:
+                r.dynamic_energy_threshold = False
+                r.energy_threshold = self.energy_threshold()
+            listen_start = time.monotonic()
+            try:
+                # A short timeout keeps pause/stop responsive while it's quiet.
+                audio = r.listen(self.source, timeout=self.poll_seconds,
+                                 phrase_time_limit=self.phrase_time_limit)
+            except sr.WaitTimeoutError:
+                continue
+            heard = time.monotonic()
+            if not audio.frame_data:
+                break  # source closed and drained
+            if self._paused.is_set() or self._stop.is_set():
+                continue
+            self._slots.acquire()
+            seq = next(self._seq)
+            with self._lock:
+                self._issued = seq + 1
+            if self.tracer is not None:
+                self.tracer.record("listen", listen_start, heard, self.trace_id, seq,
+                                   audio_seconds=len(audio.frame_data) / (audio.sample_rate * audio.sample_width))
+            try:
+                self._pool.submit(self._process, seq, audio, heard)
+            except RuntimeError:  # pool shut down by stop(): close the gap so drain() goes on
+                self._slots.release()
+                with self._lock:
+                    self._done[seq] = VoiceTurn(seq, "", "", None, time.monotonic())
+                break
+
+    def _stage(self, name: str, seq: int):
+        if self.tracer is None:
+            return contextlib.nullcontext()
+        return self.tracer.span(name, self.trace_id, seq)
+
+    def _process(self, seq: int, audio, heard=None):
+        if self.tracer is not None and heard is not None:
+            self.tracer.record("queue", heard, time.monotonic(), self.trace_id, seq)
+        try:
+            if self.vad is not None:
+                with self._stage("vad", seq):
+                    audio = self.vad.trim(audio)
+            if audio is None:
+                turn = VoiceTurn(seq, "", "", None, time.monotonic())  # no speech: never sent to a recogniser
+            else:
+                with self._stage("recognize", seq):
+                    text = self.transcribe(audio)
+                reply = ""
+                if text:
+                    with self._stage("reply", seq):
+                        reply = self.reply(text)
+                turn = VoiceTurn(seq, text, reply, None, time.monotonic())
+        except Exception as e:
+            turn = VoiceTurn(seq, "", "", str(e), time.monotonic())
+        finally:
+            self._slots.release()
+        with self._lock:
+            self._done[seq] = turn
+
+    def drain(self):
+        """Return the turns finished so far, oldest first, without skipping any still in flight."""
+        turns = []
+        with self._lock:
+            while self._next in self._done:
+                turns.append(self._done.pop(self._next))
+                self._next += 1
+        return turns